@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiV2Config(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api_v2"
+
+    def ready(self):
+        from django.contrib.auth.password_validation import (
+            get_default_password_validators,
+        )
+
+        from . import signals  # noqa: F401
+
+        # Load the common password list now rather than on the first signup.
+        get_default_password_validators()
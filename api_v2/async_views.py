@@ -0,0 +1,146 @@
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
+from django.http import JsonResponse
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import async_versioned_cache
+from .filters import AuthorFilter, BookFilter
+from .pagination import AuthorPagination, BookPagination, SearchPagination
+from .search import search_authors, search_books
+from .serializers import AuthorSerializer
+from author.models import Author
+from book.models import Book
+
+# Async twins of the catalogue reads in views.py for ASGI deployments. They
+# take the same filters, limit/offset and count parameters and return the
+# same bodies; keyset cursors stay on the DRF endpoints.
+
+NOT_FOUND = {"detail": "Not found."}
+ORDERING = ["publication_date", "-publication_date"]
+
+
+def error_response(errors, status):
+    return JsonResponse(errors, status=status, safe=False)
+
+
+async def filter_queryset(filterset_class, request, queryset):
+    filterset = filterset_class(request.GET, queryset=queryset)
+    if not await sync_to_async(filterset.is_valid)():
+        return None, error_response(filterset.errors, 400)
+    return filterset.qs, None
+
+
+async def get_slice(results, start, stop):
+    if isinstance(results, QuerySet):
+        return [item async for item in results[start:stop]]
+    return await sync_to_async(results.__getitem__)(slice(start, stop))
+
+
+async def paginate(request, results, paginator, serialize):
+    # The paginators only read query_params from the DRF request.
+    params = Request(request)
+    limit = paginator.get_limit(params)
+    offset = paginator.get_offset(params)
+    page = await get_slice(results, offset, offset + limit + 1)
+    has_next = len(page) > limit
+    page = page[:limit]
+
+    url = request.build_absolute_uri()
+    url = replace_query_param(url, paginator.limit_query_param, limit)
+    next_url = None
+    if has_next:
+        next_url = replace_query_param(
+            url, paginator.offset_query_param, offset + limit
+        )
+    previous_url = None
+    if offset > 0:
+        if offset - limit <= 0:
+            previous_url = remove_query_param(url, paginator.offset_query_param)
+        else:
+            previous_url = replace_query_param(
+                url, paginator.offset_query_param, offset - limit
+            )
+
+    body = OrderedDict()
+    if paginator.include_count(params):
+        body["count"] = await sync_to_async(paginator.get_count)(results)
+    body["next"] = next_url
+    body["previous"] = previous_url
+    body["results"] = await serialize(page)
+    return JsonResponse(body)
+
+
+async def serialize_books(books):
+    return await Book.aget_info_list(books)
+
+
+async def serialize_authors(authors):
+    return AuthorSerializer(authors, many=True).data
+
+
+def get_search_query(request):
+    return request.GET.get("q", "").strip()
+
+
+def missing_query_response():
+    return error_response({"q": ["This query parameter is required."]}, 400)
+
+
+@async_versioned_cache("book", "author")
+async def book_list(request):
+    queryset, errors = await filter_queryset(BookFilter, request, Book.objects.all())
+    if errors is not None:
+        return errors
+    ordering = request.GET.get("ordering")
+    if ordering in ORDERING:
+        queryset = queryset.order_by(ordering)
+    return await paginate(request, queryset, BookPagination(), serialize_books)
+
+
+@async_versioned_cache("book", "author")
+async def book_detail(request, pk):
+    try:
+        book = await Book.objects.aget(pk=pk)
+    except Book.DoesNotExist:
+        return error_response(NOT_FOUND, 404)
+    return JsonResponse(await book.aget_info())
+
+
+@async_versioned_cache("book", "author")
+async def book_search(request):
+    query = get_search_query(request)
+    if not query:
+        return missing_query_response()
+    books = await sync_to_async(search_books)(query)
+    return await paginate(request, books, SearchPagination(), serialize_books)
+
+
+@async_versioned_cache("author")
+async def author_list(request):
+    queryset, errors = await filter_queryset(
+        AuthorFilter, request, Author.objects.all()
+    )
+    if errors is not None:
+        return errors
+    return await paginate(request, queryset, AuthorPagination(), serialize_authors)
+
+
+@async_versioned_cache("author")
+async def author_detail(request, pk):
+    try:
+        author = await Author.objects.aget(pk=pk)
+    except Author.DoesNotExist:
+        return error_response(NOT_FOUND, 404)
+    return JsonResponse(AuthorSerializer(author).data)
+
+
+@async_versioned_cache("author")
+async def author_search(request):
+    query = get_search_query(request)
+    if not query:
+        return missing_query_response()
+    authors = await sync_to_async(search_authors)(query)
+    return await paginate(request, authors, SearchPagination(), serialize_authors)
@@ -0,0 +1,98 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication,
+    JWTStatelessUserAuthentication,
+)
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# user_id -> (expires_at, user). Each process keeps its own copy for
+# JWT_USER_LOCAL_CACHE_TIMEOUT seconds, so a change made through another
+# process reaches it at most that late; Redis entries are dropped at once.
+local_users = {}
+local_users_lock = threading.Lock()
+
+
+def get_user_cache_key(user_id):
+    return f"user:{user_id}"
+
+
+def get_cached_user(user_id):
+    now = time.monotonic()
+    with local_users_lock:
+        entry = local_users.get(user_id)
+    if entry is not None and entry[0] > now:
+        # Requests must not share one mutable instance.
+        return copy.copy(entry[1])
+
+    key = get_user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except user_model.DoesNotExist:
+            return None
+        cache.set(key, user, settings.JWT_USER_CACHE_TIMEOUT)
+
+    with local_users_lock:
+        local_users[user_id] = (now + settings.JWT_USER_LOCAL_CACHE_TIMEOUT, user)
+    return copy.copy(user)
+
+
+def drop_user(user_id):
+    with local_users_lock:
+        local_users.pop(user_id, None)
+    cache.delete(get_user_cache_key(user_id))
+
+
+def invalidate_user(user_id):
+    # Drop now and again after commit, so a lookup made mid-transaction
+    # does not cache the old row.
+    drop_user(user_id)
+    transaction.on_commit(lambda: drop_user(user_id))
+
+
+def clear_local_users():
+    with local_users_lock:
+        local_users.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+# For views whose safe methods never look at request.user beyond
+# is_authenticated: reads get a TokenUser built from the token claims with no
+# lookup at all, writes still load the user. A deactivated user keeps read
+# access until the access token expires.
+class ReadOnlyTokenUserAuthentication(CachedJWTAuthentication):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stateless = JWTStatelessUserAuthentication()
+
+    def authenticate(self, request):
+        if request.method in SAFE_METHODS:
+            return self.stateless.authenticate(request)
+        return super().authenticate(request)
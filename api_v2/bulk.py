@@ -0,0 +1,252 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .cache import bump_version
+from .search import update_search_vectors
+from .serializers import AuthorSerializer, BookSerializer
+from .signals import mute_delete_receivers
+from author.models import Author
+from book.models import Book
+
+
+class BookBulkSerializer(BookSerializer):
+    # Author ids of the whole request are checked in one query by
+    # BookBulkWriter instead of one per item.
+    authors = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+def get_batch_size(request):
+    value = request.query_params.get("batch_size", settings.BULK_BATCH_SIZE)
+    try:
+        batch_size = int(value)
+        if batch_size < 1:
+            raise ValueError
+    except ValueError:
+        raise ValidationError({"batch_size": ["A positive integer is required."]})
+    return min(batch_size, settings.BULK_MAX_BATCH_SIZE)
+
+
+def get_items(request):
+    items = request.data
+    if not isinstance(items, list) or not items:
+        raise ValidationError({"non_field_errors": ["Expected a non-empty list."]})
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise ValidationError(
+            {
+                "non_field_errors": [
+                    f"Ensure this list has no more than {settings.BULK_MAX_ITEMS} items."
+                ]
+            }
+        )
+    return items
+
+
+def get_item_id(item):
+    value = item.get("id") if isinstance(item, dict) else item
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+# Validates every item of a bulk request and writes them in batches. An item
+# error rejects the whole request; the response lists each bad item by its
+# index in the body.
+class BulkWriter:
+    model = None
+    serializer_class = None
+    version_names = ()
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.errors = []
+
+    def add_error(self, index, errors):
+        self.errors.append({"index": index, "errors": errors})
+
+    def get_instances(self, items):
+        instances = self.model.objects.in_bulk(
+            [item_id for item_id in map(get_item_id, items) if item_id is not None]
+        )
+        valid = []
+        for index, item in enumerate(items):
+            instance = instances.get(get_item_id(item))
+            if instance is None:
+                self.add_error(index, {"id": ["Not found."]})
+            else:
+                valid.append((index, instance, item))
+        return valid
+
+    def validate(self, items, partial=False):
+        valid = []
+        for index, instance, item in items:
+            serializer = self.serializer_class(instance, data=item, partial=partial)
+            if serializer.is_valid():
+                valid.append((index, instance, serializer.validated_data))
+            else:
+                self.add_error(index, serializer.errors)
+        return valid
+
+    def create(self, items):
+        valid = self.validate([(index, None, item) for index, item in enumerate(items)])
+        if self.errors:
+            return None
+        objects = [self.model(**self.get_fields(data)) for _, _, data in valid]
+        with transaction.atomic():
+            self.model.objects.bulk_create(objects, batch_size=self.batch_size)
+            self.after_write(objects, [data for _, _, data in valid])
+        return objects
+
+    def update(self, items, partial):
+        valid = self.validate(self.get_instances(items), partial)
+        if self.errors:
+            return None
+        objects = []
+        fields = set()
+        for _, instance, data in valid:
+            for name, value in self.get_fields(data).items():
+                setattr(instance, name, value)
+                fields.add(name)
+            objects.append(instance)
+        with transaction.atomic():
+            if fields:
+                self.model.objects.bulk_update(
+                    objects, sorted(fields), batch_size=self.batch_size
+                )
+            self.after_write(objects, [data for _, _, data in valid])
+        return objects
+
+    def delete(self, items):
+        ids = [instance.id for _, instance, _ in self.get_instances(items)]
+        if self.errors:
+            return None
+        with transaction.atomic():
+            self.delete_rows(ids)
+            bump_version(*self.version_names)
+        return ids
+
+    def delete_rows(self, ids):
+        with mute_delete_receivers():
+            self.model.objects.filter(id__in=ids).delete()
+
+    def get_fields(self, data):
+        return dict(data)
+
+    def after_write(self, objects, data):
+        bump_version(*self.version_names)
+
+    def represent(self, objects):
+        return self.serializer_class(objects, many=True).data
+
+
+class BookBulkWriter(BulkWriter):
+    model = Book
+    serializer_class = BookBulkSerializer
+    version_names = ("book",)
+
+    def validate(self, items, partial=False):
+        valid = super().validate(items, partial)
+        author_ids = {
+            author_id for _, _, data in valid for author_id in data.get("authors", [])
+        }
+        existing = set(
+            Author.objects.filter(id__in=author_ids).values_list("id", flat=True)
+        )
+        checked = []
+        for index, instance, data in valid:
+            missing = [
+                author_id
+                for author_id in data.get("authors", [])
+                if author_id not in existing
+            ]
+            if missing:
+                self.add_error(
+                    index,
+                    {
+                        "authors": [
+                            f'Invalid pk "{author_id}" - object does not exist.'
+                            for author_id in missing
+                        ]
+                    },
+                )
+            else:
+                checked.append((index, instance, data))
+        return checked
+
+    def get_fields(self, data):
+        return {name: value for name, value in data.items() if name != "authors"}
+
+    def after_write(self, books, data):
+        # One insert into the through table for all items that set authors.
+        through = Book.authors.through
+        links = {
+            book.id: dict.fromkeys(book_data["authors"])
+            for book, book_data in zip(books, data)
+            if "authors" in book_data
+        }
+        through.objects.filter(book_id__in=links).delete()
+        through.objects.bulk_create(
+            [
+                through(book_id=book_id, author_id=author_id)
+                for book_id, author_ids in links.items()
+                for author_id in author_ids
+            ],
+            batch_size=self.batch_size,
+        )
+        update_search_vectors(book.id for book in books)
+        super().after_write(books, data)
+
+    def represent(self, books):
+        return Book.get_info_list(books)
+
+
+class AuthorBulkWriter(BulkWriter):
+    model = Author
+    serializer_class = AuthorSerializer
+    version_names = ("author",)
+
+    @staticmethod
+    def get_book_ids(author_ids):
+        return (
+            Book.authors.through.objects.filter(author_id__in=author_ids)
+            .values_list("book_id", flat=True)
+            .distinct()
+        )
+
+    def after_write(self, authors, data):
+        update_search_vectors(self.get_book_ids([author.id for author in authors]))
+        super().after_write(authors, data)
+
+    def delete_rows(self, ids):
+        # The links go with the authors, so their books are read first.
+        book_ids = list(self.get_book_ids(ids))
+        super().delete_rows(ids)
+        update_search_vectors(book_ids)
+
+
+class BulkMixin:
+    bulk_writer_class = None
+
+    @action(detail=False, methods=["post", "put", "patch", "delete"])
+    def bulk(self, request):
+        writer = self.bulk_writer_class(get_batch_size(request))
+        items = get_items(request)
+        if request.method == "DELETE":
+            if writer.delete(items) is None:
+                return Response(
+                    {"errors": writer.errors}, status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if request.method == "POST":
+            objects = writer.create(items)
+            success_status = status.HTTP_201_CREATED
+        else:
+            objects = writer.update(items, partial=request.method == "PATCH")
+            success_status = status.HTTP_200_OK
+        if objects is None:
+            return Response(
+                {"errors": writer.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(writer.represent(objects), status=success_status)
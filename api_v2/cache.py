@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from book_store.metrics import record_cache
+
+stats = Counter()
+stats_lock = threading.Lock()
+
+
+def get_version_key(name):
+    return f"version:{name}"
+
+
+def get_versions(*names):
+    keys = [get_version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock instead of 1 so a lost version key can
+            # never match responses cached under an older counter.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_version(name):
+    return get_versions(name)[0]
+
+
+def increment_versions(names):
+    for name in names:
+        try:
+            cache.incr(get_version_key(name))
+        except ValueError:
+            cache.add(get_version_key(name), time.time_ns(), timeout=None)
+
+
+def bump_version(*names):
+    # Bump now for this connection's reads and again after commit, so a
+    # response cached by another request mid-transaction is not kept.
+    increment_versions(names)
+    transaction.on_commit(partial(increment_versions, names))
+
+
+def record(event):
+    with stats_lock:
+        stats[event] += 1
+    record_cache(event)
+
+
+def get_stats():
+    with stats_lock:
+        return {"hits": stats["hits"], "misses": stats["misses"]}
+
+
+def get_response_cache_key(request, names):
+    versions = ":".join(str(version) for version in get_versions(*names))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"response:{versions}:{path}"
+
+
+def versioned_cache(*names, timeout=60 * 5):
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return view_func(request, *args, **kwargs)
+
+            key = get_response_cache_key(request, names)
+            data = cache.get(key)
+            if data is not None:
+                record("hits")
+                return Response(data)
+
+            record("misses")
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_cached_response(request, names):
+    key = get_response_cache_key(request, names)
+    return key, cache.get(key)
+
+
+def async_versioned_cache(*names, timeout=60 * 5):
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            # One hop to the sync cache client for both the versions and the
+            # response.
+            key, content = await sync_to_async(get_cached_response)(request, names)
+            if content is not None:
+                record("hits")
+                return HttpResponse(content, content_type="application/json")
+
+            record("misses")
+            response = await view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(key, response.content, timeout)
+            return response
+
+        return wrapper
+
+    return decorator
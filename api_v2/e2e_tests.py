@@ -451,7 +451,8 @@ def test_orders_post_valid_one_book():
     )
     response_body = r.json()
     test_id["test_order_id"] = response_body["order_id"]
-    assert r.status_code == 200
+    assert r.status_code == 202
+    assert response_body["status"] == "pending_invoice"
     assert "order_id" and "pageUrl" in response_body
 
 
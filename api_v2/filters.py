@@ -0,0 +1,25 @@
+from django_filters import rest_framework as filters
+
+from author.models import Author
+from book.models import Book
+from order.models import Order
+
+
+class BookFilter(filters.FilterSet):
+    class Meta:
+        model = Book
+        fields = ["name", "genre", "authors"]
+
+
+class AuthorFilter(filters.FilterSet):
+    class Meta:
+        model = Author
+        fields = ["first_name"]
+
+
+class OrderFilter(filters.FilterSet):
+    created_at = filters.IsoDateTimeFromToRangeFilter()
+
+    class Meta:
+        model = Order
+        fields = ["user", "status", "created_at"]
@@ -0,0 +1,181 @@
+import datetime
+import io
+import json
+from base64 import urlsafe_b64encode
+from urllib.parse import urlencode
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api_v2.cache import increment_versions
+from book.models import Book
+from order.models import Order
+
+TABLES = [
+    "author_author",
+    "book_book",
+    "book_book_authors",
+    "auth_user",
+    "order_order",
+    "order_orderitem",
+]
+# Versions of the response and count caches the replayed requests fill.
+VERSION_NAMES = ["book", "author", "order"]
+
+
+def encode_cursor(position):
+    cursor = json.dumps({"r": 0, "p": position})
+    return urlsafe_b64encode(cursor.encode("ascii")).decode("ascii")
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the API's filter and ordering combinations under EXPLAIN "
+        "and fail on sequential scans"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=20000,
+            help="Books and orders to seed in a rolled back transaction",
+        )
+        parser.add_argument(
+            "--no-seed",
+            action="store_true",
+            help="Use the data already in the database",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if not options["no_seed"]:
+                    self.seed(options["rows"])
+                self.analyze()
+                increment_versions(VERSION_NAMES)
+                failures = self.check_plans()
+                transaction.set_rollback(True)
+        finally:
+            # Responses and counts cached during the replay describe the
+            # rolled back rows; move the live versions past them.
+            increment_versions(VERSION_NAMES)
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} request(s) use sequential scans: "
+                + ", ".join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS("No sequential scans"))
+
+    def seed(self, rows):
+        call_command(
+            "seed_store",
+            authors=max(rows // 10, 1),
+            books=rows,
+            users=max(rows // 100, 1),
+            orders=rows,
+            max_items_per_order=2,
+            stdout=io.StringIO(),
+        )
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            for table in TABLES:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+
+    def get_paths(self):
+        book = Book.objects.order_by("id").first()
+        author = book.authors.order_by("id").first()
+        order = Order.objects.order_by("-id").first()
+        created_at = order.created_at - datetime.timedelta(hours=1)
+        cursor = encode_cursor([book.publication_date.isoformat(), book.id])
+        return [
+            ("/api/v2/books/", {"count": "false", "name": book.name}),
+            ("/api/v2/books/", {"genre": book.genre}),
+            ("/api/v2/books/", {"count": "false", "authors": author.id}),
+            ("/api/v2/books/", {"count": "false", "ordering": "publication_date"}),
+            ("/api/v2/books/", {"pagination": "cursor"}),
+            (
+                "/api/v2/books/",
+                {"pagination": "cursor", "ordering": "-publication_date"},
+            ),
+            ("/api/v2/books/", {"cursor": cursor}),
+            (f"/api/v2/books/{book.id}/", {}),
+            ("/api/v2/authors/", {"first_name": author.first_name}),
+            ("/api/v2/authors/", {"pagination": "cursor"}),
+            (f"/api/v2/authors/{author.id}/", {}),
+            ("/api/v2/orders/", {}),
+            ("/api/v2/orders/", {"user": order.user_id}),
+            ("/api/v2/orders/", {"status": order.status}),
+            ("/api/v2/orders/", {"created_at_after": created_at.isoformat()}),
+            (f"/api/v2/orders/{order.id}/", {}),
+        ]
+
+    def check_plans(self):
+        client = Client(SERVER_NAME="localhost")
+        failures = []
+        for path, params in self.get_paths():
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(path, params)
+            if params:
+                path = f"{path}?{urlencode(params)}"
+            if response.status_code != 200:
+                raise CommandError(f"GET {path} returned {response.status_code}")
+
+            scans = set()
+            for query in queries:
+                if query["sql"].startswith("SELECT"):
+                    scans.update(self.get_sequential_scans(query["sql"]))
+            if scans:
+                failures.append(path)
+                self.stdout.write(
+                    self.style.ERROR(f"SEQ SCAN {path}: {', '.join(sorted(scans))}")
+                )
+            else:
+                self.stdout.write(f"OK {path}")
+        return failures
+
+    def get_sequential_scans(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return set(self.get_postgres_scans(plan[0]["Plan"]))
+
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            details = [detail for *_, detail in cursor.fetchall()]
+
+        # SQLite reports "SCAN <table>" for full scans and adds "USING ...
+        # INDEX" when the scan walks an index instead. A bare scan that needs
+        # no sort for its ORDER BY ... LIMIT walks the rowid (primary key) and
+        # stops early, which is what an index scan on the pkey does on Postgres,
+        # but only while no WHERE predicate on that table has to be checked
+        # row by row.
+        ordered = " ORDER BY " in sql and " LIMIT " in sql
+        sorted_early = ordered and not any(
+            "TEMP B-TREE" in detail for detail in details
+        )
+        where = sql.partition(" WHERE ")[2]
+        scans = set()
+        for detail in details:
+            if not detail.startswith("SCAN ") or "USING" in detail:
+                continue
+            table = detail.split()[1]
+            if table not in TABLES:
+                continue
+            if sorted_early and f'"{table}".' not in where:
+                continue
+            scans.add(table)
+        return scans
+
+    def get_postgres_scans(self, node):
+        if node["Node Type"] == "Seq Scan" and node["Relation Name"] in TABLES:
+            yield node["Relation Name"]
+        for child in node.get("Plans", []):
+            yield from self.get_postgres_scans(child)
@@ -0,0 +1,182 @@
+import csv
+import json
+import pathlib
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api_v2.cache import increment_versions
+from api_v2.search import update_search_vectors
+from api_v2.utils import chunks
+from author.models import Author
+from book.models import Book
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+FIELDS = ["sku", "name", "genre", "publication_date", "price", "count"]
+UPDATE_FIELDS = ["name", "genre", "publication_date", "price", "count"]
+AUTHOR_KEY = ["first_name", "last_name", "patronymic"]
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(Exception):
+    pass
+
+
+def read_csv(file):
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(file):
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = RowError(f"invalid JSON: {exc}")
+        yield line_number, row
+
+
+def get_author_key(author):
+    if isinstance(author, dict):
+        parts = [author.get(name, "") for name in AUTHOR_KEY]
+    else:
+        parts = str(author).split(maxsplit=2)
+    return tuple(part.strip() for part in parts) + ("",) * (3 - len(parts))
+
+
+# Upserts books keyed by sku from a CSV or JSON Lines file. Rows flow through
+# generators one chunk at a time and authors are resolved by name from a
+# lookup loaded once, so memory does not grow with the file. Each chunk is
+# one transaction: a book upsert, an id lookup and one insert of author links.
+class Command(BaseCommand):
+    help = "Import books from a CSV or JSON Lines catalogue, matching them by sku"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Catalogue file, or - for stdin")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or FORMATS.get(pathlib.Path(path).suffix)
+        if file_format is None:
+            raise CommandError("Cannot tell the format from the name, use --format")
+        read = read_csv if file_format == "csv" else read_jsonl
+
+        self.authors = self.load_authors()
+        self.rows = self.created = self.updated = self.errors = 0
+        self.started = time.perf_counter()
+        if path == "-":
+            self.import_rows(read(sys.stdin), options["batch_size"])
+        else:
+            with open(path, newline="", encoding="utf-8") as file:
+                self.import_rows(read(file), options["batch_size"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.created + self.updated} books ({self.created} new, "
+                f"{self.updated} updated), skipped {self.errors} rows "
+                f"in {time.perf_counter() - self.started:.1f}s"
+            )
+        )
+
+    @staticmethod
+    def load_authors():
+        authors = {}
+        # Lowest id wins when two authors share a name.
+        rows = Author.objects.order_by("-id").values_list("id", *AUTHOR_KEY)
+        for author_id, *key in rows.iterator():
+            authors[tuple(key)] = author_id
+        return authors
+
+    def import_rows(self, rows, batch_size):
+        for chunk in chunks(self.parse(rows), batch_size):
+            self.write(chunk)
+            increment_versions(["book"])
+            elapsed = time.perf_counter() - self.started
+            self.stdout.write(
+                f"{self.rows} rows, {self.rows / elapsed:.0f} rows/s, "
+                f"{self.errors} skipped"
+            )
+
+    def parse(self, rows):
+        for line_number, row in rows:
+            self.rows += 1
+            try:
+                yield self.parse_row(row)
+            except RowError as exc:
+                self.report_error(line_number, exc)
+            except ValidationError as exc:
+                self.report_error(
+                    line_number,
+                    "; ".join(
+                        f"{name}: {' '.join(messages)}"
+                        for name, messages in exc.message_dict.items()
+                    ),
+                )
+
+    def parse_row(self, row):
+        if isinstance(row, RowError):
+            raise row
+        if not isinstance(row, dict):
+            raise RowError("expected an object")
+        if not row.get("sku"):
+            raise RowError("sku is required")
+
+        # Missing and empty values fall back to the model defaults, for
+        # existing books too: the file is the source of truth.
+        fields = {name: row[name] for name in FIELDS if row.get(name) not in ("", None)}
+        book = Book(**fields)
+        book.clean_fields(exclude=["id", "search_vector"])
+
+        author_ids = None
+        authors = row.get("authors")
+        if authors:
+            if isinstance(authors, str):
+                authors = authors.split(";")
+            author_ids = []
+            for author in authors:
+                key = get_author_key(author)
+                if key not in self.authors:
+                    raise RowError(f"unknown author {' '.join(key).strip()!r}")
+                author_ids.append(self.authors[key])
+        return book, author_ids
+
+    def report_error(self, line_number, message):
+        self.errors += 1
+        if self.errors <= MAX_REPORTED_ERRORS:
+            self.stderr.write(f"line {line_number}: {message}")
+
+    def write(self, chunk):
+        # A later row for the same sku replaces an earlier one.
+        rows = {book.sku: (book, author_ids) for book, author_ids in chunk}
+        through = Book.authors.through
+        with transaction.atomic():
+            existing = Book.objects.filter(sku__in=rows).count()
+            Book.objects.bulk_create(
+                [book for book, _ in rows.values()],
+                update_conflicts=True,
+                unique_fields=["sku"],
+                update_fields=UPDATE_FIELDS,
+            )
+            ids = dict(Book.objects.filter(sku__in=rows).values_list("sku", "id"))
+            links = {
+                ids[sku]: dict.fromkeys(author_ids)
+                for sku, (_, author_ids) in rows.items()
+                if author_ids is not None
+            }
+            through.objects.filter(book_id__in=links).delete()
+            through.objects.bulk_create(
+                through(book_id=book_id, author_id=author_id)
+                for book_id, author_ids in links.items()
+                for author_id in author_ids
+            )
+            update_search_vectors(ids.values())
+        self.created += len(rows) - existing
+        self.updated += existing
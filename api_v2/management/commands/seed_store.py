@@ -0,0 +1,182 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api_v2.cache import increment_versions
+from api_v2.search import update_search_vectors
+from api_v2.utils import chunks
+from author.models import Author
+from book.models import Book
+from order.models import Order, OrderItem
+
+SYLLABLES = [
+    "ka", "ri", "to", "ne", "la", "mo", "vi", "sa", "de", "ru",
+    "po", "li", "an", "ko", "ta", "me", "sho", "ven", "dra", "ly",
+]  # fmt: skip
+GENRES = [
+    "novel", "poetry", "drama", "fantasy", "history", "science",
+    "detective", "biography", "children", "horror", "romance", "travel",
+]  # fmt: skip
+STATUSES = ["created", "processing", "hold", "success", "failure", "expired"]
+STATUS_WEIGHTS = [10, 5, 1, 70, 10, 4]
+# Orders are dated back from a fixed moment, not the clock, unless --now is
+# given.
+EPOCH = "2025-01-01T00:00:00+00:00"
+
+
+def parse_datetime(value):
+    moment = datetime.datetime.fromisoformat(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, datetime.timezone.utc)
+    return moment
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+
+
+# Bulk-generates a catalogue with orders. Rows are built lazily and inserted
+# one chunk at a time with explicit ids, so foreign keys are picked by id
+# range and memory stays flat at any volume. The same --seed gives the same
+# data.
+class Command(BaseCommand):
+    help = "Generate synthetic authors, books, users, orders and order items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--authors", type=int, default=1000)
+        parser.add_argument("--books", type=int, default=10000)
+        parser.add_argument("--max-authors-per-book", type=int, default=3)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--orders", type=int, default=10000)
+        parser.add_argument("--max-items-per-order", type=int, default=5)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--now", type=parse_datetime, default=EPOCH)
+        parser.add_argument("--password", default="password")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        authors = self.insert(Author, self.generate_authors(options["authors"]))
+        books = self.insert(Book, self.generate_books(options["books"]))
+        self.insert(
+            Book.authors.through,
+            self.generate_book_authors(books, authors, options["max_authors_per_book"]),
+        )
+        users = self.insert(
+            User, self.generate_users(options["users"], options["password"])
+        )
+        orders = self.insert(
+            Order,
+            self.generate_orders(
+                options["orders"], users, options["now"], options["days"]
+            ),
+        )
+        self.insert(
+            OrderItem,
+            self.generate_order_items(orders, books, options["max_items_per_order"]),
+        )
+
+        self.reset_sequences()
+        for book_ids in chunks(books, self.batch_size):
+            update_search_vectors(book_ids)
+        increment_versions(["book", "author"])
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def insert(self, model, rows):
+        first_id = next_id(model)
+        total = 0
+        for chunk in chunks(rows, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            total += len(chunk)
+            self.stdout.write(f"{model._meta.label}: {total}")
+        return range(first_id, next_id(model))
+
+    def reset_sequences(self):
+        models = [Author, Book, Book.authors.through, User, Order, OrderItem]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def get_word(self, syllables=3):
+        return "".join(
+            self.rng.choice(SYLLABLES) for _ in range(self.rng.randint(2, syllables))
+        )
+
+    def generate_authors(self, count):
+        first_id = next_id(Author)
+        for i in range(count):
+            yield Author(
+                id=first_id + i,
+                first_name=self.get_word().capitalize(),
+                last_name=f"{self.get_word(4)}ko".capitalize(),
+                patronymic=f"{self.get_word()}ovych".capitalize(),
+                birthday=datetime.date(1800, 1, 1)
+                + datetime.timedelta(days=self.rng.randrange(70000)),
+            )
+
+    def generate_books(self, count):
+        first_id = next_id(Book)
+        for i in range(count):
+            words = self.rng.randint(1, 4)
+            yield Book(
+                id=first_id + i,
+                name=" ".join(self.get_word() for _ in range(words)).capitalize(),
+                genre=self.rng.choice(GENRES),
+                publication_date=datetime.date(1850, 1, 1)
+                + datetime.timedelta(days=self.rng.randrange(63000)),
+                price=self.rng.randrange(100, 5000) * 10,
+                count=self.rng.randrange(0, 1000),
+            )
+
+    def generate_book_authors(self, books, authors, max_authors):
+        for book_id in books:
+            count = min(self.rng.randint(1, max_authors), len(authors))
+            for author_id in self.rng.sample(authors, count):
+                yield Book.authors.through(book_id=book_id, author_id=author_id)
+
+    def generate_users(self, count, password):
+        first_id = next_id(User)
+        password = make_password(password)
+        for i in range(count):
+            yield User(
+                id=first_id + i,
+                username=f"seed_user{first_id + i}",
+                password=password,
+            )
+
+    def generate_orders(self, count, users, now, days):
+        first_id = next_id(Order)
+        for i in range(count):
+            status = self.rng.choices(STATUSES, STATUS_WEIGHTS)[0]
+            created_at = now - datetime.timedelta(
+                seconds=self.rng.randrange(days * 86400)
+            )
+            yield Order(
+                id=first_id + i,
+                user_id=self.rng.choice(users),
+                status=status,
+                created_at=created_at,
+                stock_decremented_at=created_at if status == "success" else None,
+            )
+
+    def generate_order_items(self, orders, books, max_items):
+        for order_id in orders:
+            count = min(self.rng.randint(1, max_items), len(books))
+            for book_id in self.rng.sample(books, count):
+                yield OrderItem(
+                    order_id=order_id,
+                    book_id=book_id,
+                    quantity=self.rng.randint(1, 3),
+                )
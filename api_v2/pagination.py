@@ -0,0 +1,247 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import get_version
+
+
+# The cursor holds the ordering values of the edge row, so a page is one
+# range scan on a unique (composite) key: no OFFSET and no COUNT(*).
+class KeysetPagination(CursorPagination):
+    ordering = ("-id",)
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        reverse, position = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.reverse_field(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(self.ordering)
+
+    @staticmethod
+    def reverse_field(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def get_keyset_filter(ordering, position):
+        keyset_filter = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = Q(**{f"{name}__{lookup}": position[index]})
+            for previous_field, value in zip(ordering[:index], position):
+                condition &= Q(**{previous_field.lstrip("-"): value})
+            keyset_filter |= condition
+        return keyset_filter
+
+    def get_position(self, instance):
+        return [getattr(instance, field.lstrip("-")) for field in self.ordering]
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            reverse = bool(cursor["r"])
+            values = cursor["p"]
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            # Tampered values must not reach filter().
+            position = []
+            for field, value in zip(self.ordering, values):
+                value = model._meta.get_field(field.lstrip("-")).to_python(value)
+                if value is None:
+                    raise ValueError
+                position.append(value)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, reverse, position):
+        cursor = json.dumps({"r": int(reverse), "p": position}, cls=DjangoJSONEncoder)
+        encoded = urlsafe_b64encode(cursor.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(False, self.get_position(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.get_position(self.page[0]))
+
+
+def get_estimated_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+# Limit/offset by default, keyset pagination when the client opts in with
+# ?pagination=cursor and then follows the next/previous links.
+#
+# Totals are cheap approximations: unfiltered lists of large tables read the
+# planner estimate from pg_class, filtered lists cache the exact COUNT(*) for
+# a short time, and ?count=false skips the count entirely.
+class CatalogPagination(LimitOffsetPagination):
+    keyset_ordering = ("id",)
+    mode_query_param = "pagination"
+    count_query_param = "count"
+    count_cache_timeout = 30
+    estimated_count_threshold = 100000
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination()
+            self.keyset.ordering = self.get_keyset_ordering(request)
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        self.count = None
+        if self.include_count(request):
+            self.count = self.get_count(queryset)
+            if self.count > self.limit and self.template is not None:
+                self.display_page_controls = True
+
+        results = list(queryset[self.offset : self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[: self.limit]
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def include_count(self, request):
+        value = request.query_params.get(self.count_query_param, "true")
+        return value.lower() not in ("false", "0", "no")
+
+    def get_keyset_ordering(self, request):
+        if request.query_params.get("ordering") == f"-{self.keyset_ordering[0]}":
+            return tuple(
+                KeysetPagination.reverse_field(field) for field in self.keyset_ordering
+            )
+        return self.keyset_ordering
+
+    def get_count(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            return len(queryset)
+        if not queryset.query.where:
+            estimate = get_estimated_count(queryset)
+            if estimate is not None and estimate >= self.estimated_count_threshold:
+                return estimate
+            return super().get_count(queryset)
+
+        key = self.get_count_cache_key(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = super().get_count(queryset)
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_count_cache_key(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+        name = queryset.model._meta.model_name
+        return f"count:{name}:{get_version(name)}:{digest}"
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        offset = self.offset + self.limit
+        return replace_query_param(url, self.offset_query_param, offset)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if self.count is None:
+            return Response(
+                OrderedDict(
+                    [
+                        ("next", self.get_next_link()),
+                        ("previous", self.get_previous_link()),
+                        ("results", data),
+                    ]
+                )
+            )
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
+
+
+class BookPagination(CatalogPagination):
+    keyset_ordering = ("publication_date", "id")
+
+
+# Search results are ordered by rank, which has no stable keyset.
+class SearchPagination(CatalogPagination):
+    def use_keyset(self, request):
+        return False
+
+
+class AuthorPagination(CatalogPagination):
+    keyset_ordering = ("id",)
+
+
+class OrderPagination(KeysetPagination):
+    ordering = ("-id",)
@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import password_validation
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from book_store import metrics
+
+# PBKDF2 releases the GIL, so a few threads hash in parallel while the cap
+# keeps a signup burst from taking every core away from the other requests.
+pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASHING_WORKERS, thread_name_prefix="password"
+)
+# Tasks queued or running; past this, callers wait up to
+# PASSWORD_HASHING_QUEUE_TIMEOUT seconds and are then turned away.
+slots = threading.BoundedSemaphore(settings.PASSWORD_HASHING_QUEUE_SIZE)
+
+
+class PasswordPoolBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many registrations at once, try again later."
+    default_code = "password_pool_busy"
+
+
+def run_in_pool(task, func, *args, **kwargs):
+    labels = {"task": task}
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT):
+        with metrics.registry.lock:
+            metrics.password_pool_rejected.inc(labels)
+        raise PasswordPoolBusy
+
+    queued_at = time.perf_counter()
+
+    def run():
+        started_at = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with metrics.registry.lock:
+                metrics.password_pool_wait.observe(labels, started_at - queued_at)
+                metrics.password_pool_run.observe(
+                    labels, time.perf_counter() - started_at
+                )
+
+    with metrics.registry.lock:
+        metrics.password_pool_tasks.inc(labels)
+    try:
+        return pool.submit(run).result()
+    finally:
+        with metrics.registry.lock:
+            metrics.password_pool_tasks.dec(labels)
+        slots.release()
+
+
+@lru_cache
+def load_common_passwords(path):
+    return frozenset(password_validation.CommonPasswordValidator(path).passwords)
+
+
+# Shares one frozenset per list between validator instances; ApiV2Config
+# loads it at startup instead of on the first registration.
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    def __init__(self, password_list_path=None):
+        if password_list_path is None:
+            password_list_path = self.DEFAULT_PASSWORD_LIST_PATH
+        self.passwords = load_common_passwords(str(password_list_path))
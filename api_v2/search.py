@@ -0,0 +1,243 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from author.models import Author
+from book.models import Book
+from .cache import get_versions
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Same weights Postgres gives to the A/B/C labels of book_book.search_vector.
+NAME_WEIGHT = 1.0
+GENRE_WEIGHT = 0.4
+AUTHOR_WEIGHT = 0.2
+PREFIX_FACTOR = 0.5
+
+# pg_trgm's default pg_trgm.word_similarity_threshold.
+AUTHOR_SIMILARITY_THRESHOLD = 0.6
+AUTHOR_FIELDS = ("first_name", "last_name", "patronymic")
+
+SEARCH_VECTOR_SQL = """
+    UPDATE book_book SET search_vector =
+        setweight(to_tsvector('simple', book_book.name), 'A')
+        || setweight(to_tsvector('simple', book_book.genre), 'B')
+        || setweight(to_tsvector('simple', coalesce((
+            SELECT string_agg(
+                author_author.first_name || ' ' || author_author.last_name
+                || ' ' || author_author.patronymic, ' '
+            )
+            FROM author_author
+            JOIN book_book_authors
+                ON book_book_authors.author_id = author_author.id
+            WHERE book_book_authors.book_id = book_book.id
+        ), '')), 'C')
+    WHERE book_book.id = ANY(%s)
+"""
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def use_postgres():
+    return connection.vendor == "postgresql"
+
+
+def update_search_vectors(book_ids):
+    book_ids = list(book_ids)
+    if not book_ids or not use_postgres():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(SEARCH_VECTOR_SQL, [book_ids])
+
+
+# Inverted index over the whole catalogue for databases without full-text
+# search. Terms are kept sorted so a query token also matches as a prefix.
+class BookSearchIndex:
+    version_names = ("book", "author")
+
+    def __init__(self, versions=None):
+        self.versions = versions
+        self.postings = defaultdict(dict)
+        self.terms = []
+
+    def add(self, book_id, text, weight):
+        for term in set(tokenize(text)):
+            postings = self.postings[term]
+            postings[book_id] = postings.get(book_id, 0) + weight
+
+    def build(self):
+        author_names = {
+            author.id: author.get_full_name() for author in Author.objects.all()
+        }
+        for book_id, name, genre in Book.objects.values_list("id", "name", "genre"):
+            self.add(book_id, name, NAME_WEIGHT)
+            self.add(book_id, genre, GENRE_WEIGHT)
+        names = defaultdict(list)
+        links = Book.authors.through.objects.values_list("book_id", "author_id")
+        for book_id, author_id in links:
+            names[book_id].append(author_names[author_id])
+        for book_id, book_names in names.items():
+            self.add(book_id, " ".join(book_names), AUTHOR_WEIGHT)
+        self.terms = sorted(self.postings)
+        return self
+
+    def match(self, token):
+        scores = {}
+        index = bisect_left(self.terms, token)
+        while index < len(self.terms) and self.terms[index].startswith(token):
+            term = self.terms[index]
+            factor = 1.0 if term == token else PREFIX_FACTOR
+            for book_id, weight in self.postings[term].items():
+                scores[book_id] = max(scores.get(book_id, 0), weight * factor)
+            index += 1
+        return scores
+
+    def search(self, query):
+        scores = None
+        for token in tokenize(query):
+            matches = self.match(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    book_id: score + matches[book_id]
+                    for book_id, score in scores.items()
+                    if book_id in matches
+                }
+            if not scores:
+                return []
+        if scores is None:
+            return []
+        return sorted(scores, key=lambda book_id: (-scores[book_id], book_id))
+
+
+def get_trigrams(word):
+    # Padded like pg_trgm, but without the trailing blank so that a query
+    # word also matches as a prefix.
+    word = f"  {word}"
+    return {word[index : index + 3] for index in range(len(word) - 2)}
+
+
+# Trigram index over author names for databases without pg_trgm. Scores
+# follow word_similarity(): the share of query trigrams found in a name.
+class AuthorSearchIndex:
+    version_names = ("author",)
+
+    def __init__(self, versions=None):
+        self.versions = versions
+        self.postings = defaultdict(set)
+        self.word_authors = defaultdict(set)
+
+    def build(self):
+        for author in Author.objects.values_list("id", *AUTHOR_FIELDS):
+            for word in tokenize(" ".join(author[1:])):
+                self.word_authors[word].add(author[0])
+        for word in self.word_authors:
+            for trigram in get_trigrams(word):
+                self.postings[trigram].add(word)
+        return self
+
+    def match(self, token):
+        trigrams = get_trigrams(token)
+        overlaps = defaultdict(int)
+        for trigram in trigrams:
+            for word in self.postings.get(trigram, ()):
+                overlaps[word] += 1
+        scores = {}
+        for word, overlap in overlaps.items():
+            similarity = overlap / len(trigrams)
+            for author_id in self.word_authors[word]:
+                scores[author_id] = max(scores.get(author_id, 0), similarity)
+        return scores
+
+    def search(self, query):
+        tokens = tokenize(query)
+        scores = defaultdict(float)
+        for token in tokens:
+            for author_id, similarity in self.match(token).items():
+                scores[author_id] += similarity / len(tokens)
+        ranked = [
+            author_id
+            for author_id, score in scores.items()
+            if score >= AUTHOR_SIMILARITY_THRESHOLD
+        ]
+        return sorted(ranked, key=lambda author_id: (-scores[author_id], author_id))
+
+
+indexes = {}
+indexes_lock = threading.Lock()
+
+
+def get_index(index_class):
+    versions = get_versions(*index_class.version_names)
+    with indexes_lock:
+        index = indexes.get(index_class)
+        if index is None or index.versions != versions:
+            index = indexes[index_class] = index_class(versions).build()
+        return index
+
+
+# Ranked ids from an in-memory index; only the sliced page is loaded.
+class RankedResults:
+    def __init__(self, model, ids):
+        self.model = model
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, item):
+        ids = self.ids[item]
+        objects = self.model.objects.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
+
+def search_books(query):
+    tokens = tokenize(query)
+    if not tokens:
+        return RankedResults(Book, [])
+    if use_postgres():
+        search_query = SearchQuery(
+            " & ".join(f"{token}:*" for token in tokens),
+            search_type="raw",
+            config="simple",
+        )
+        return (
+            Book.objects.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "id")
+        )
+    return RankedResults(Book, get_index(BookSearchIndex).search(query))
+
+
+def search_authors(query):
+    query = " ".join(tokenize(query))
+    if not query:
+        return RankedResults(Author, [])
+    if use_postgres():
+        # trigram_word_similar is the %> operator, served by the gin_trgm_ops
+        # indexes from author migration 0003.
+        condition = Q()
+        for field in AUTHOR_FIELDS:
+            condition |= Q(**{f"{field}__trigram_word_similar": query})
+        similarity = Greatest(
+            *(TrigramWordSimilarity(query, field) for field in AUTHOR_FIELDS)
+        )
+        return (
+            Author.objects.filter(condition)
+            .annotate(similarity=similarity)
+            .order_by("-similarity", "id")
+        )
+    return RankedResults(Author, get_index(AuthorSearchIndex).search(query))
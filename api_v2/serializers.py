@@ -1,7 +1,9 @@
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password, ValidationError
 from rest_framework import serializers
 
+from .passwords import run_in_pool
 from author.models import Author
 from book.models import Book
 from order.models import Order
@@ -41,15 +43,15 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data["username"],
-            password=validated_data["password"],
+        user = User.objects.create(
+            username=User.normalize_username(validated_data["username"]),
+            password=run_in_pool("hash", make_password, validated_data["password"]),
         )
         return user
 
     def validate_password(self, value):
         try:
-            validate_password(value)
+            run_in_pool("validate", validate_password, value)
         except ValidationError as exc:
             raise serializers.ValidationError(str(exc))
         return value
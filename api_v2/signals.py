@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from author.models import Author
+from book.models import Book
+from .authentication import invalidate_user
+from .cache import bump_version
+from .search import update_search_vectors
+
+# Set while a bulk writer deletes rows; it bumps versions and refreshes search
+# vectors once for the whole request instead of once per row.
+bulk_deleting = ContextVar("bulk_deleting", default=False)
+
+
+@contextmanager
+def mute_delete_receivers():
+    token = bulk_deleting.set(True)
+    try:
+        yield
+    finally:
+        bulk_deleting.reset(token)
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver(m2m_changed, sender=Book.authors.through)
+def bump_book_version(sender, **kwargs):
+    if not bulk_deleting.get():
+        bump_version("book")
+
+
+@receiver([post_save, post_delete], sender=Author)
+def bump_author_version(sender, **kwargs):
+    if not bulk_deleting.get():
+        bump_version("author")
+
+
+@receiver(post_save, sender=Book)
+def update_book_search_vector(sender, instance, **kwargs):
+    update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def update_authors_search_vectors(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        update_search_vectors([instance.pk])
+    elif pk_set:
+        update_search_vectors(pk_set)
+
+
+@receiver(post_save, sender=Author)
+def update_author_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(instance.book.values_list("id", flat=True))
+
+
+# Deleting an author drops its book links without m2m_changed, so remember
+# the books before the delete and refresh them once it is done.
+@receiver(pre_delete, sender=Author)
+def remember_author_books(sender, instance, **kwargs):
+    if bulk_deleting.get():
+        return
+    instance.deleted_book_ids = list(instance.book.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def update_deleted_author_search_vectors(sender, instance, **kwargs):
+    update_search_vectors(getattr(instance, "deleted_book_ids", []))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
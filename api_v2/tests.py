@@ -1,12 +1,45 @@
+import datetime
+import io
 import json
+from base64 import urlsafe_b64encode
 import pathlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
+import responses
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.management import call_command
-from rest_framework.test import APIClient
+from django.db import connection
+from django.db.backends.postgresql.base import (
+    DatabaseWrapper as PostgresDatabaseWrapper,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.models import TokenUser
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from api_v2.authentication import (
+    CachedJWTAuthentication,
+    ReadOnlyTokenUserAuthentication,
+    clear_local_users,
+)
+from api_v2 import passwords, search
+from api_v2.cache import get_stats
+from api_v2.management.commands.check_query_plans import Command as CheckQueryPlans
+from author.models import Author
+from book.models import Book
+from book_store import metrics
+from book_store.nplusone import NPlusOneDetector
+from order.models import Order, OrderItem
+from order import mono
+from order.models import InvoiceOutbox
+from order.mono import create_mono_order
+from order.monobank_stub import MonobankStub
+
 root = pathlib.Path(__file__).parent
 
 
@@ -16,6 +49,39 @@ def django_db_setup(django_db_setup, django_db_blocker):
         call_command("loaddata", "db_init.yaml")
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    clear_local_users()
+
+
+@pytest.fixture
+def mono_stub(settings):
+    mono.verifying_key.update(pub_key=None, key=None, refreshed_at=0.0)
+    with MonobankStub() as stub:
+        settings.MONOBANK_API_URL = stub.url
+        yield stub
+    mono.verifying_key.update(pub_key=None, key=None, refreshed_at=0.0)
+
+
+def post_mono_callback(stub, status="processing", sign=True):
+    body = json.dumps(
+        {
+            "invoiceId": "230719CWUB73pSvT9C6X",
+            "status": status,
+            "amount": 10000,
+            "ccy": 980,
+            "reference": "1",
+        }
+    ).encode()
+    return APIClient().post(
+        "/api/v2/monobank/callback",
+        data=body,
+        content_type="application/json",
+        HTTP_X_SIGN=stub.sign(body) if sign else "invalid",
+    )
+
+
 @pytest.fixture
 def api_client():
     user = User.objects.create_user(username="test", password="test")
@@ -25,6 +91,14 @@ def api_client():
     return client
 
 
+@pytest.fixture
+def metrics_client(settings):
+    settings.METRICS_TOKEN = "scraper"
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Bearer scraper")
+    return client
+
+
 @pytest.fixture
 def api_client_is_staff():
     user = User.objects.create_user(username="test", password="test", is_staff="True")
@@ -72,6 +146,583 @@ def test_books_invalid_authors_filter_get(api_client):
     assert response_body == expected_response
 
 
+@pytest.mark.django_db
+def test_books_list_query_count_does_not_grow_with_page_size(api_client):
+    authors = Author.objects.all()
+    for i in range(20):
+        book = Book.objects.create(
+            name=f"bulk{i}", genre="bulk", publication_date="2000-01-01"
+        )
+        book.authors.set(authors[: i % 3 + 1])
+
+    with CaptureQueriesContext(connection) as small_page:
+        response = api_client.get("/api/v2/books/?genre=bulk&limit=2")
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 2
+
+    cache.clear()
+    with CaptureQueriesContext(connection) as large_page:
+        response = api_client.get("/api/v2/books/?genre=bulk&limit=20")
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 20
+    assert response.json()["results"][2]["authors"] == [
+        "a_fn1 l1 p1",
+        "a_fn2 l2 p2",
+        "a_fn2 l3 p3",
+    ]
+
+    assert len(large_page) == len(small_page)
+
+
+@pytest.mark.django_db
+def test_books_cursor_pagination(api_client):
+    for i in range(4):
+        Book.objects.create(
+            name=f"cursor{i}", genre="g1", publication_date=f"198{i % 2}-01-01"
+        )
+    expected_ids = list(
+        Book.objects.order_by("publication_date", "id").values_list("id", flat=True)
+    )
+
+    ids = []
+    url = "/api/v2/books/?pagination=cursor&limit=3"
+    while url:
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url)
+        response_body = response.json()
+        assert response.status_code == 200
+        assert "count" not in response_body
+        assert not any("COUNT(" in query["sql"] for query in queries)
+        ids += [book["id"] for book in response_body["results"]]
+        url = response_body["next"]
+    assert ids == expected_ids
+
+    response = api_client.get(response_body["previous"])
+    assert [book["id"] for book in response.json()["results"]] == expected_ids[3:6]
+
+    response = api_client.get(
+        "/api/v2/books/?pagination=cursor&ordering=-publication_date"
+    )
+    assert [book["id"] for book in response.json()["results"]] == expected_ids[::-1]
+
+
+@pytest.mark.django_db
+def test_books_filtered_count_is_cached(api_client):
+    with CaptureQueriesContext(connection) as first:
+        response = api_client.get("/api/v2/books/?genre=g1")
+    assert response.json()["count"] == 2
+    assert any("COUNT(" in query["sql"] for query in first)
+
+    with CaptureQueriesContext(connection) as second:
+        response = api_client.get("/api/v2/books/?genre=g1&offset=1")
+    assert response.json()["count"] == 2
+    assert not any("COUNT(" in query["sql"] for query in second)
+
+
+@pytest.mark.django_db
+def test_books_get_without_count(api_client):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get("/api/v2/books/?count=false&limit=2")
+    response_body = response.json()
+    assert response.status_code == 200
+    assert "count" not in response_body
+    assert not any("COUNT(" in query["sql"] for query in queries)
+    assert [book["id"] for book in response_body["results"]] == [1, 2]
+    assert response_body["next"] == (
+        "http://testserver/api/v2/books/?count=false&limit=2&offset=2"
+    )
+
+    response = api_client.get(response_body["next"])
+    response_body = response.json()
+    assert [book["id"] for book in response_body["results"]] == [3]
+    assert response_body["next"] is None
+
+
+@pytest.mark.django_db
+def test_books_invalid_cursor(api_client):
+    response = api_client.get("/api/v2/books/?cursor=invalid")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "path, position",
+    [
+        ("authors", ["abc"]),
+        ("orders", ["abc"]),
+        ("authors", [[1]]),
+        ("books", ["abc", "x"]),
+        ("books", [None, 1]),
+        ("books", "ab"),
+    ],
+)
+def test_tampered_cursor_values(api_client, path, position):
+    cursor = urlsafe_b64encode(json.dumps({"r": 0, "p": position}).encode())
+    response = api_client.get(
+        f"/api/v2/{path}/?pagination=cursor&cursor={cursor.decode()}"
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.django_db
+def test_books_search_ranks_name_over_genre_and_authors(api_client):
+    author = Author.objects.create(
+        first_name="Taras", last_name="Shevchenko", birthday="1814-03-09"
+    )
+    by_author = Book.objects.create(
+        name="Poems", genre="poetry", publication_date="1840-01-01"
+    )
+    by_author.authors.add(author)
+    by_genre = Book.objects.create(
+        name="Collected", genre="kobzar", publication_date="1840-01-01"
+    )
+    by_name = Book.objects.create(
+        name="Kobzar", genre="poetry", publication_date="1840-01-01"
+    )
+    by_name.authors.add(author)
+
+    response = api_client.get("/api/v2/books/search/?q=kobz")
+    response_body = response.json()
+    assert response.status_code == 200
+    assert response_body["count"] == 2
+    assert [book["id"] for book in response_body["results"]] == [
+        by_name.id,
+        by_genre.id,
+    ]
+    assert response_body["results"][0]["authors"] == ["Taras Shevchenko "]
+
+    response = api_client.get("/api/v2/books/search/?q=shevchenko poe")
+    assert [book["id"] for book in response.json()["results"]] == [
+        by_author.id,
+        by_name.id,
+    ]
+
+
+@pytest.mark.django_db
+def test_books_search_sees_new_books(api_client):
+    response = api_client.get("/api/v2/books/search/?q=dune")
+    assert response.json()["count"] == 0
+
+    book = Book.objects.create(
+        name="Dune", genre="sci-fi", publication_date="1965-08-01"
+    )
+    response = api_client.get("/api/v2/books/search/?q=dune")
+    assert [book["id"] for book in response.json()["results"]] == [book.id]
+
+
+@pytest.mark.django_db
+def test_deleting_authors_refreshes_book_search_vectors(api_client, monkeypatch):
+    refreshed = []
+
+    def update_search_vectors(book_ids):
+        book_ids = sorted(book_ids)
+        if book_ids:
+            refreshed.append(book_ids)
+
+    monkeypatch.setattr("api_v2.signals.update_search_vectors", update_search_vectors)
+    monkeypatch.setattr("api_v2.bulk.update_search_vectors", update_search_vectors)
+    api_client.delete("/api/v2/authors/2/")
+    assert refreshed == [[2]]
+
+    refreshed.clear()
+    response = api_client.delete("/api/v2/authors/bulk/", data=[1], format="json")
+    assert response.status_code == 204
+    assert refreshed == [[1, 2]]
+
+
+@pytest.mark.django_db
+def test_books_search_without_query(api_client):
+    response = api_client.get("/api/v2/books/search/")
+    assert response.status_code == 400
+    assert response.json() == {"q": ["This query parameter is required."]}
+
+    response = api_client.get("/api/v2/books/search/?q=!!!")
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+
+
+@pytest.mark.django_db
+def test_authors_search_is_typo_tolerant_and_prefix_aware(api_client):
+    shevchenko = Author.objects.create(
+        first_name="Taras", last_name="Shevchenko", birthday="1814-03-09"
+    )
+    shevchuk = Author.objects.create(
+        first_name="Valerii", last_name="Shevchuk", birthday="1939-08-20"
+    )
+    Author.objects.create(
+        first_name="Lesya", last_name="Ukrainka", birthday="1871-02-25"
+    )
+
+    response = api_client.get("/api/v2/authors/search/?q=shevch")
+    response_body = response.json()
+    assert response.status_code == 200
+    assert response_body["count"] == 2
+    assert [author["id"] for author in response_body["results"]] == [
+        shevchenko.id,
+        shevchuk.id,
+    ]
+
+    response = api_client.get("/api/v2/authors/search/?q=shevcenko")
+    assert [author["id"] for author in response.json()["results"]] == [shevchenko.id]
+
+    response = api_client.get("/api/v2/authors/search/?q=taras shevchenko")
+    assert response.json()["results"][0]["last_name"] == "Shevchenko"
+
+
+def test_search_builds_postgres_queries(monkeypatch):
+    monkeypatch.setattr(search, "use_postgres", lambda: True)
+    postgres = PostgresDatabaseWrapper(
+        {**connection.settings_dict, "ENGINE": "django.db.backends.postgresql"}
+    )
+
+    sql, params = (
+        search.search_authors("Shevch").query.get_compiler(connection=postgres).as_sql()
+    )
+    assert '"author_author"."last_name" %%> %s' in sql
+    assert "GREATEST(WORD_SIMILARITY(%s" in sql
+    assert set(params) == {"shevch"}
+
+    sql, params = (
+        search.search_books("Kobzar").query.get_compiler(connection=postgres).as_sql()
+    )
+    assert '"book_book"."search_vector" @@' in sql
+    assert "kobzar:*" in params
+
+
+@pytest.mark.django_db
+def test_authors_search_without_query(api_client):
+    response = api_client.get("/api/v2/authors/search/")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_check_query_plans_finds_no_sequential_scans(api_client):
+    out = io.StringIO()
+    call_command("check_query_plans", rows=1000, stdout=out)
+    assert "No sequential scans" in out.getvalue()
+    assert Book.objects.count() == 3
+
+    # Nothing the replay cached for the rolled back rows is served.
+    response = api_client.get("/api/v2/books/?count=false&ordering=publication_date")
+    assert len(response.json()["results"]) == 3
+    response = api_client.get("/api/v2/authors/?pagination=cursor")
+    assert len(response.json()["results"]) == Author.objects.count()
+
+
+@pytest.mark.django_db
+def test_check_query_plans_flags_filtered_scans_on_sqlite():
+    command = CheckQueryPlans()
+    columns = '"order_order"."id", "order_order"."status"'
+    assert command.get_sequential_scans(
+        f'SELECT {columns} FROM "order_order" WHERE "order_order"."pay_url" = \'x\' '
+        'ORDER BY "order_order"."id" DESC LIMIT 11'
+    ) == {"order_order"}
+    assert (
+        command.get_sequential_scans(
+            f'SELECT {columns} FROM "order_order" '
+            'ORDER BY "order_order"."id" DESC LIMIT 11'
+        )
+        == set()
+    )
+
+
+@pytest.mark.django_db
+def test_seed_store_is_deterministic():
+    options = dict(
+        authors=20, books=50, users=5, orders=40, batch_size=7, stdout=io.StringIO()
+    )
+
+    def get_data():
+        return (
+            list(Book.objects.order_by("id").values_list("name", "genre")[3:]),
+            list(
+                Order.objects.order_by("id").values_list(
+                    "user__username", "status", "created_at", "stock_decremented_at"
+                )
+            ),
+            list(
+                OrderItem.objects.order_by("id").values_list(
+                    "order_id", "book_id", "quantity"
+                )
+            ),
+        )
+
+    call_command("seed_store", seed=1, **options)
+    books, orders, items = data = get_data()
+    assert len(books) == 50
+    assert Author.objects.count() == 23
+    assert Order.objects.filter(user__username__startswith="seed_user").count() == 40
+    assert not Book.objects.filter(authors=None).exists()
+    assert 40 <= len(items) <= 200
+    assert all(
+        created_at <= datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        for _, _, created_at, _ in orders
+    )
+
+    Order.objects.filter(user__username__startswith="seed_user").delete()
+    User.objects.filter(username__startswith="seed_user").delete()
+    Book.objects.filter(id__gt=3).delete()
+    call_command("seed_store", seed=1, **options)
+    assert get_data() == data
+
+
+@pytest.mark.django_db
+def test_import_catalogue_upserts_by_sku(tmp_path):
+    csv_file = tmp_path / "catalogue.csv"
+    csv_file.write_text(
+        "sku,name,genre,publication_date,price,count,authors\n"
+        "s1,first,g,2020-01-01,500,3,a_fn1 l1 p1;a_fn2 l3 p3\n"
+        "s2,second,g,2020-01-02,,,a_fn2 l2 p2\n"
+        "s3,bad date,g,someday,,,\n"
+        "s4,unknown author,g,2020-01-02,,,nobody\n"
+        ",no sku,g,2020-01-02,,,\n"
+    )
+    out, err = io.StringIO(), io.StringIO()
+    call_command(
+        "import_catalogue", str(csv_file), batch_size=1, stdout=out, stderr=err
+    )
+    assert "Imported 2 books (2 new, 0 updated), skipped 3 rows" in out.getvalue()
+    assert "line 4: publication_date:" in err.getvalue()
+    assert "line 5: unknown author 'nobody'" in err.getvalue()
+    first = Book.objects.get(sku="s1")
+    assert first.get_info()["authors"] == ["a_fn1 l1 p1", "a_fn2 l3 p3"]
+    assert (first.price, first.count) == (500, 3)
+    assert Book.objects.get(sku="s2").price == 1000
+
+    jsonl_file = tmp_path / "catalogue.jsonl"
+    jsonl_file.write_text(
+        json.dumps(
+            {
+                "sku": "s1",
+                "name": "renamed",
+                "genre": "g",
+                "publication_date": "2020-01-01",
+                "authors": [
+                    {"first_name": "a_fn1", "last_name": "l1", "patronymic": "p1"}
+                ],
+            }
+        )
+        + "\n{broken\n"
+        + json.dumps(
+            {"sku": "s5", "name": "new", "genre": "g", "publication_date": "2021-01-01"}
+        )
+        + "\n"
+    )
+    out = io.StringIO()
+    with CaptureQueriesContext(connection) as captured:
+        call_command("import_catalogue", str(jsonl_file), stdout=out, stderr=err)
+    assert "Imported 2 books (1 new, 1 updated), skipped 1 rows" in out.getvalue()
+    assert len(captured) < 15
+    first.refresh_from_db()
+    assert first.get_info()["authors"] == ["a_fn1 l1 p1"]
+    assert (first.name, first.price) == ("renamed", 1000)
+    assert Book.objects.filter(sku__isnull=False).count() == 3
+
+
+@pytest.mark.django_db
+def test_request_metrics(api_client, metrics_client, settings, caplog):
+    settings.REQUEST_METRICS_SAMPLE_RATE = 1
+    metrics.registry.clear()
+
+    with caplog.at_level("INFO", logger="book_store.requests"):
+        first = api_client.get("/api/v2/books/")
+        second = api_client.get("/api/v2/books/")
+    assert 'cache;desc="0 hits 1 misses"' in first["Server-Timing"]
+    assert 'cache;desc="1 hits 0 misses"' in second["Server-Timing"]
+    assert "db;dur=" in first["Server-Timing"]
+    line = json.loads(caplog.records[0].getMessage())
+    assert line["route"] == "api/v2/books/$"
+    assert line["db_queries"] > 0
+    assert line["bytes"] == len(first.content)
+
+    body = metrics_client.get("/metrics").content.decode()
+    assert (
+        'http_requests_total{route="api/v2/books/$",method="GET",status="200"} 2.0'
+        in body
+    )
+    assert 'http_request_cache_total{route="api/v2/books/$",event="hits"} 1' in body
+    assert (
+        'http_request_duration_seconds_count{route="api/v2/books/$",method="GET"} 2'
+        in body
+    )
+
+
+@pytest.mark.django_db
+def test_request_metrics_unsampled(api_client, metrics_client, settings):
+    settings.REQUEST_METRICS_SAMPLE_RATE = 0
+    metrics.registry.clear()
+
+    response = api_client.get("/api/v2/authors/")
+    assert "Server-Timing" not in response
+    body = metrics_client.get("/metrics").content.decode()
+    assert 'http_requests_total{route="api/v2/authors/$"' in body
+    assert "http_request_db_queries_count" not in body
+
+
+@pytest.mark.django_db
+def test_metrics_require_token_unless_public(api_client, settings):
+    settings.METRICS_TOKEN = ""
+    assert APIClient().get("/metrics").status_code == 404
+    settings.METRICS_TOKEN = "scraper"
+    assert APIClient().get("/metrics").status_code == 404
+    assert api_client.get("/metrics").status_code == 404
+    response = APIClient().get("/metrics", HTTP_AUTHORIZATION="Bearer scraper")
+    assert response.status_code == 200
+    settings.METRICS_PUBLIC = True
+    assert APIClient().get("/metrics").status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.nplusone(enabled=False)
+def test_nplusone_detector_reports_repeated_statements():
+    Book.objects.bulk_create(
+        Book(name=f"n{i}", genre="g", publication_date="2000-01-01") for i in range(5)
+    )
+    detector = NPlusOneDetector(threshold=3)
+    detector.install()
+    try:
+        for book in Book.objects.all():
+            book.get_info()
+        APIClient().get("/api/v2/books/?count=false")
+        assert detector.violations == []
+
+        APIClient().get("/api/books/")
+    finally:
+        detector.uninstall()
+    assert len(detector.violations) == 1
+    shape, stack = detector.violations[0]
+    assert '"book_book_authors"."book_id" = %s' in shape
+    assert "in get_info" in stack
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "path",
+    [
+        "books/",
+        "books/?limit=2&offset=1",
+        "books/?genre=g1&ordering=-publication_date",
+        "books/?count=false&limit=1",
+        "books/1/",
+        "books/search/?q=b",
+        "authors/",
+        "authors/?first_name=a_fn2",
+        "authors/2/",
+        "authors/search/?q=l2",
+    ],
+)
+def test_async_catalogue_matches_drf_views(api_client, path):
+    drf = api_client.get(f"/api/v2/{path}")
+    cache.clear()
+    response = api_client.get(f"/api/v2/async/{path}")
+    assert response.status_code == drf.status_code == 200
+    assert response.json() == json.loads(
+        drf.content.decode().replace("/api/v2/", "/api/v2/async/")
+    )
+
+
+@pytest.mark.django_db
+def test_async_catalogue_errors(api_client):
+    response = api_client.get("/api/v2/async/books/100/")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Not found."}
+
+    response = api_client.get("/api/v2/async/books/?authors=a")
+    assert response.status_code == 400
+    assert response.json() == api_client.get("/api/v2/books/?authors=a").json()
+
+    response = api_client.get("/api/v2/async/authors/search/")
+    assert response.status_code == 400
+
+
+def get_token_request(user, method="get"):
+    token = RefreshToken.for_user(user).access_token
+    return getattr(APIRequestFactory(), method)(
+        "/", HTTP_AUTHORIZATION=f"Bearer {token}"
+    )
+
+
+@pytest.mark.django_db
+def test_jwt_user_lookups_are_cached():
+    user = User.objects.create_user(username="test", password="test")
+    request = get_token_request(user)
+    authentication = CachedJWTAuthentication()
+
+    with CaptureQueriesContext(connection) as first:
+        assert authentication.authenticate(request)[0] == user
+    with CaptureQueriesContext(connection) as second:
+        assert authentication.authenticate(request)[0] == user
+    clear_local_users()
+    with CaptureQueriesContext(connection) as from_redis:
+        assert authentication.authenticate(request)[0] == user
+    assert (len(first), len(second), len(from_redis)) == (1, 0, 0)
+
+    user.first_name = "renamed"
+    user.save()
+    assert authentication.authenticate(request)[0].first_name == "renamed"
+
+    user.is_active = False
+    user.save()
+    with pytest.raises(AuthenticationFailed):
+        authentication.authenticate(request)
+
+    user.delete()
+    with pytest.raises(AuthenticationFailed):
+        authentication.authenticate(request)
+
+
+@pytest.mark.django_db
+def test_read_only_requests_use_token_user():
+    user = User.objects.create_user(username="test", password="test")
+    authentication = ReadOnlyTokenUserAuthentication()
+
+    with CaptureQueriesContext(connection) as captured:
+        token_user = authentication.authenticate(get_token_request(user))[0]
+    assert isinstance(token_user, TokenUser)
+    assert token_user.id == user.id
+    assert len(captured) == 0
+    assert authentication.authenticate(get_token_request(user, "post"))[0] == user
+
+
+@pytest.mark.django_db
+def test_books_export(api_client, settings, tmp_path):
+    settings.EXPORT_CHUNK_SIZE = 2
+    Book.objects.filter(id=2).update(sku="s2")
+    response = api_client.get("/api/v2/books/export/")
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    expected = json.load(open(root / "fixtures/books_get_response.json"))["results"]
+    expected = [
+        {**book, "sku": "s2" if book["id"] == 2 else None}
+        for book in sorted(expected, key=lambda book: book["id"])
+    ]
+    assert [json.loads(line) for line in lines] == expected
+
+    response = api_client.get("/api/v2/books/export/?output=csv&genre=g2")
+    assert response["Content-Disposition"] == 'attachment; filename="books.csv"'
+    content = b"".join(response.streaming_content).decode()
+    assert content.splitlines() == [
+        "id,sku,name,authors,genre,publication_date,count,price",
+        "2,s2,b2,a_fn1 l1 p1;a_fn2 l2 p2,g2,1990-01-01,20,20000",
+    ]
+
+    # The export reads back through import_catalogue unchanged.
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_text(content)
+    out = io.StringIO()
+    call_command("import_catalogue", str(csv_file), stdout=out, stderr=io.StringIO())
+    assert "Imported 1 books (0 new, 1 updated), skipped 0 rows" in out.getvalue()
+    book = json.loads(json.dumps(Book.objects.get(id=2).get_info(), default=str))
+    assert {**book, "sku": "s2"} == expected[1]
+
+    response = api_client.get("/api/v2/books/export/?output=xml")
+    assert response.status_code == 400
+    assert response.json() == {"output": ['"xml" is not a valid choice.']}
+
+
 @pytest.mark.django_db
 def test_books_id_get(api_client):
     response = api_client.get("/api/v2/books/1/")
@@ -81,6 +732,53 @@ def test_books_id_get(api_client):
     assert response_body == expected_response
 
 
+@pytest.mark.django_db
+def test_books_responses_are_cached():
+    client = APIClient()
+    stats = get_stats()
+    client.get("/api/v2/books/1/")
+    client.get("/api/v2/books/")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/api/v2/books/1/")
+        list_response = client.get("/api/v2/books/")
+    assert response.json() == json.load(
+        open(root / "fixtures/books_id_get_response.json")
+    )
+    assert list_response.json() == json.load(
+        open(root / "fixtures/books_get_response.json")
+    )
+    assert len(queries) == 0
+    assert get_stats()["hits"] == stats["hits"] + 2
+    assert get_stats()["misses"] == stats["misses"] + 2
+
+
+@pytest.mark.django_db
+def test_books_cache_is_invalidated_on_write(api_client):
+    api_client.get("/api/v2/books/1/")
+    api_client.get("/api/v2/books/")
+
+    book = Book.objects.get(id=1)
+    book.count = 5
+    book.save()
+    response = api_client.get("/api/v2/books/1/")
+    assert response.json()["count"] == 5
+
+    book.authors.add(2)
+    response = api_client.get("/api/v2/books/")
+    assert response.json()["results"][0]["authors"] == ["a_fn1 l1 p1", "a_fn2 l2 p2"]
+
+    author = Author.objects.get(id=2)
+    author.last_name = "new"
+    author.save()
+    response = api_client.get("/api/v2/books/1/")
+    assert response.json()["authors"] == ["a_fn1 l1 p1", "a_fn2 new p2"]
+
+    Book.objects.get(id=3).delete()
+    response = api_client.get("/api/v2/books/")
+    assert response.json()["count"] == 2
+
+
 @pytest.mark.django_db
 def test_books_id_invalid_get(api_client):
     response = api_client.get("/api/v2/books/10/")
@@ -232,6 +930,146 @@ def test_books_post_invalid_author_not_found(api_client):
     assert response_body == expected_response
 
 
+def new_book(name, authors):
+    return {
+        "name": name,
+        "authors": authors,
+        "genre": "bulk",
+        "publication_date": "2023-05-20",
+    }
+
+
+@pytest.mark.django_db
+def test_books_bulk_create_update_delete(api_client):
+    api_client.get("/api/v2/books/")
+    items = [new_book(f"bulk{i}", [1, 2] if i % 2 else [3]) for i in range(10)]
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.post(
+            "/api/v2/books/bulk/?batch_size=3", data=items, format="json"
+        )
+    assert response.status_code == 201
+    created = response.json()
+    assert [book["name"] for book in created] == [f"bulk{i}" for i in range(10)]
+    assert created[1]["authors"] == ["a_fn1 l1 p1", "a_fn2 l2 p2"]
+    assert len(captured) < 20
+    # The list is no longer served from the response cache.
+    assert api_client.get("/api/v2/books/?genre=bulk").json()["count"] == 10
+
+    ids = [book["id"] for book in created]
+    response = api_client.patch(
+        "/api/v2/books/bulk/",
+        data=[{"id": ids[0], "count": 7}, {"id": ids[1], "authors": [3]}],
+        format="json",
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["count"] == 7
+    assert response.json()[1]["authors"] == ["a_fn2 l3 p3"]
+    assert Book.objects.get(id=ids[1]).name == "bulk1"
+
+    response = api_client.delete("/api/v2/books/bulk/", data=ids, format="json")
+    assert response.status_code == 204
+    assert not Book.objects.filter(id__in=ids).exists()
+
+
+@pytest.mark.django_db
+def test_books_bulk_reports_item_errors(api_client):
+    items = [new_book("ok", [1]), new_book("x" * 129, [1]), new_book("b", [1, 9])]
+    response = api_client.post("/api/v2/books/bulk/", data=items, format="json")
+    assert response.status_code == 400
+    assert response.json() == {
+        "errors": [
+            {
+                "index": 1,
+                "errors": {
+                    "name": ["Ensure this field has no more than 128 characters."]
+                },
+            },
+            {
+                "index": 2,
+                "errors": {"authors": ['Invalid pk "9" - object does not exist.']},
+            },
+        ]
+    }
+    assert not Book.objects.filter(name="ok").exists()
+
+    response = api_client.put(
+        "/api/v2/books/bulk/", data=[{"id": 100, "name": "n"}], format="json"
+    )
+    assert response.json() == {
+        "errors": [{"index": 0, "errors": {"id": ["Not found."]}}]
+    }
+
+    response = api_client.post("/api/v2/books/bulk/", data={}, format="json")
+    assert response.status_code == 400
+    response = api_client.post(
+        "/api/v2/books/bulk/?batch_size=0", data=items, format="json"
+    )
+    assert response.json() == {"batch_size": ["A positive integer is required."]}
+    response = APIClient().post("/api/v2/books/bulk/", items, format="json")
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_bulk_delete_query_count_does_not_grow_with_items(api_client, monkeypatch):
+    incr = cache.incr
+    incr_calls = []
+    monkeypatch.setattr(
+        cache, "incr", lambda key, *args: incr_calls.append(key) or incr(key, *args)
+    )
+    book = Book.objects.get(id=1)
+    author_ids = set(book.authors.values_list("id", flat=True))
+
+    def delete(path, count):
+        if "authors" in path:
+            objects = Author.objects.bulk_create(
+                Author(first_name=f"del{i}", last_name="l", birthday="1970-01-01")
+                for i in range(count)
+            )
+            book.authors.add(*objects)
+        else:
+            objects = Book.objects.bulk_create(
+                Book(name=f"del{i}", genre="g", publication_date="2000-01-01")
+                for i in range(count)
+            )
+        # Every request should load the user from the database.
+        cache.clear()
+        clear_local_users()
+        incr_calls.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.delete(
+                path, data=[obj.id for obj in objects], format="json"
+            )
+        assert response.status_code == 204
+        return len(queries), len(incr_calls)
+
+    for path in ["/api/v2/authors/bulk/", "/api/v2/books/bulk/"]:
+        assert delete(path, 5) == delete(path, 50)
+    assert set(book.authors.values_list("id", flat=True)) == author_ids
+    assert not Book.objects.filter(name__startswith="del").exists()
+
+
+@pytest.mark.django_db
+def test_authors_bulk_create_and_update(api_client):
+    items = [
+        {"first_name": f"bulk{i}", "last_name": "l", "birthday": "1970-01-01"}
+        for i in range(3)
+    ]
+    response = api_client.post("/api/v2/authors/bulk/", data=items, format="json")
+    assert response.status_code == 201
+    assert [author["first_name"] for author in response.json()] == [
+        "bulk0",
+        "bulk1",
+        "bulk2",
+    ]
+
+    api_client.get("/api/v2/books/1/")
+    response = api_client.patch(
+        "/api/v2/authors/bulk/", data=[{"id": 1, "last_name": "renamed"}], format="json"
+    )
+    assert response.status_code == 200
+    assert api_client.get("/api/v2/books/1/").json()["authors"] == ["a_fn1 renamed p1"]
+
+
 @pytest.mark.django_db
 def test_books_id_put_all_field(api_client):
     body = {
@@ -403,6 +1241,19 @@ def test_authors_invalid_filter_get(api_client):
     assert response_body == expected_response
 
 
+@pytest.mark.django_db
+def test_authors_cursor_pagination(api_client):
+    response = api_client.get("/api/v2/authors/?pagination=cursor&limit=2")
+    response_body = response.json()
+    assert response.status_code == 200
+    assert [author["id"] for author in response_body["results"]] == [1, 2]
+
+    response = api_client.get(response_body["next"])
+    response_body = response.json()
+    assert [author["id"] for author in response_body["results"]] == [3]
+    assert response_body["next"] is None
+
+
 @pytest.mark.django_db
 def test_authors_post_valid(api_client):
     body = {
@@ -708,6 +1559,46 @@ def test_users_post_short_password(api_client):
     assert response_body == expected_response
 
 
+@pytest.mark.django_db
+def test_users_post_hashes_on_password_pool(api_client, metrics_client):
+    metrics.registry.clear()
+    response = api_client.post(
+        "/api/v2/users/", data={"username": "pooled", "password": "random4!"}
+    )
+    assert response.status_code == 201
+    assert User.objects.get(username="pooled").check_password("random4!")
+
+    body = metrics_client.get("/metrics").content.decode()
+    assert 'password_pool_run_seconds_count{task="hash"} 1' in body
+    assert 'password_pool_wait_seconds_count{task="validate"} 1' in body
+    assert 'password_pool_tasks{task="hash"} 0.0' in body
+
+    response = api_client.post(
+        "/api/v2/users/", data={"username": "common", "password": "password123"}
+    )
+    assert response.status_code == 400
+    assert "too common" in response.json()["password"][0]
+
+
+@pytest.mark.django_db
+def test_users_post_when_password_pool_is_full(
+    api_client, metrics_client, settings, monkeypatch
+):
+    metrics.registry.clear()
+    settings.PASSWORD_HASHING_QUEUE_TIMEOUT = 0
+    monkeypatch.setattr(passwords, "slots", threading.BoundedSemaphore(1))
+    passwords.slots.acquire()
+
+    response = api_client.post(
+        "/api/v2/users/", data={"username": "busy", "password": "random4!"}
+    )
+    assert response.status_code == 503
+    assert response.json()["detail"] == passwords.PasswordPoolBusy.default_detail
+    assert not User.objects.filter(username="busy").exists()
+    body = metrics_client.get("/metrics").content.decode()
+    assert 'password_pool_rejected_total{task="validate"} 1.0' in body
+
+
 @pytest.mark.django_db
 def test_users_post_same_username(api_client):
     body = {"username": "test_user_2", "password": "random4!"}
@@ -819,6 +1710,96 @@ def test_orders_get(api_client):
     assert response_body == expected_response
 
 
+def create_order_with_items(items_count):
+    order = Order.objects.create(
+        user_id=1, status="created", created_at="2023-07-21T10:00:00Z"
+    )
+    for i in range(items_count):
+        book = Book.objects.create(
+            name=f"order_book{i}", genre="g", publication_date="2000-01-01", price=100
+        )
+        OrderItem.objects.create(order=order, book=book, quantity=i + 1)
+    return order
+
+
+@pytest.mark.django_db
+def test_orders_get_query_count_does_not_grow_with_items(api_client):
+    create_order_with_items(1)
+    with CaptureQueriesContext(connection) as few_items:
+        response = api_client.get("/api/v2/orders/")
+    assert response.status_code == 200
+
+    order = create_order_with_items(10)
+    with CaptureQueriesContext(connection) as many_items:
+        response = api_client.get("/api/v2/orders/")
+    assert response.status_code == 200
+    assert response.json()["results"][0]["full_price"] == 5500
+    assert len(response.json()["results"][0]["books"]) == 10
+
+    with CaptureQueriesContext(connection) as one_order:
+        response = api_client.get(f"/api/v2/orders/{order.id}/")
+    assert response.status_code == 200
+    assert response.json()["full_price"] == 5500
+
+    assert len(many_items) == len(few_items)
+    assert len(one_order) <= len(few_items)
+
+
+@pytest.mark.django_db
+def test_orders_get_pagination(api_client):
+    orders = [create_order_with_items(1) for _ in range(3)]
+    response = api_client.get("/api/v2/orders/?limit=2")
+    response_body = response.json()
+    assert response.status_code == 200
+    assert [order["id"] for order in response_body["results"]] == [
+        orders[2].id,
+        orders[1].id,
+    ]
+    assert response_body["previous"] is None
+
+    response = api_client.get(response_body["next"])
+    response_body = response.json()
+    assert response.status_code == 200
+    assert [order["id"] for order in response_body["results"]] == [orders[0].id, 1]
+    assert response_body["next"] is None
+
+
+@pytest.mark.django_db
+def test_orders_get_filters(api_client):
+    order = create_order_with_items(1)
+    Order.objects.filter(id=order.id).update(status="success", user_id=2)
+
+    response = api_client.get("/api/v2/orders/?status=success")
+    assert [row["id"] for row in response.json()["results"]] == [order.id]
+
+    response = api_client.get("/api/v2/orders/?user=1")
+    assert [row["id"] for row in response.json()["results"]] == [1]
+
+    response = api_client.get(
+        "/api/v2/orders/?created_at_after=2023-07-21T00:00:00Z"
+        "&created_at_before=2023-07-22T00:00:00Z"
+    )
+    assert [row["id"] for row in response.json()["results"]] == [order.id]
+
+
+@pytest.mark.django_db
+@responses.activate
+def test_create_mono_order_query_count_does_not_grow_with_items():
+    responses.post(
+        "https://api.monobank.ua/api/merchant/invoice/create",
+        json={"invoiceId": "test_invoice", "pageUrl": "https://pay.test/invoice"},
+    )
+    order = create_order_with_items(10)
+    with CaptureQueriesContext(connection) as queries:
+        response = create_mono_order(order, "https://store.test/callback")
+    body = json.loads(responses.calls[0].request.body)
+
+    assert response == {"order_id": order.id, "pageUrl": "https://pay.test/invoice"}
+    assert body["amount"] == 5500
+    assert len(body["merchantPaymInfo"]["basketOrder"]) == 10
+    assert len(queries) == 2
+
+
 @pytest.mark.django_db
 def test_orders_post_valid_one_book(api_client):
     body = {"books": [{"book_id": 1, "quantity": 2}]}
@@ -827,7 +1808,9 @@ def test_orders_post_valid_one_book(api_client):
         "/api/v2/orders/", data=json_body, content_type="application/json"
     )
     response_body = response.json()
-    assert response.status_code == 200
+    assert response.status_code == 202
+    assert response_body["status"] == "pending_invoice"
+    assert response_body["pageUrl"] is None
     assert "order_id" and "pageUrl" in response_body
 
 
@@ -839,10 +1822,152 @@ def test_orders_post_valid_two_book(api_client):
         "/api/v2/orders/", data=json_body, content_type="application/json"
     )
     response_body = response.json()
-    assert response.status_code == 200
+    assert response.status_code == 202
+    assert response_body["status"] == "pending_invoice"
+    assert response_body["pageUrl"] is None
     assert "order_id" and "pageUrl" in response_body
 
 
+@pytest.mark.django_db
+def test_orders_post_query_count_does_not_grow_with_lines(api_client, mono_stub):
+    books = [
+        Book.objects.create(
+            name=f"line{i}", genre="g", publication_date="2000-01-01", count=5
+        )
+        for i in range(20)
+    ]
+
+    with CaptureQueriesContext(connection) as one_line:
+        response = api_client.post(
+            "/api/v2/orders/",
+            data={"books": [{"book_id": books[0].id, "quantity": 1}]},
+            format="json",
+        )
+    assert response.status_code == 202
+
+    rows = [{"book_id": book.id, "quantity": 2} for book in books]
+    rows.append({"book_id": books[0].id, "quantity": 3})
+    # Both requests should load the user from the database.
+    cache.clear()
+    clear_local_users()
+    with CaptureQueriesContext(connection) as many_lines:
+        response = api_client.post(
+            "/api/v2/orders/", data={"books": rows}, format="json"
+        )
+    assert response.status_code == 202
+    order = Order.objects.with_items().get(id=response.json()["order_id"])
+    assert order.full_price == 20 * 2 * 1000 + 3 * 1000
+    assert order.orderitem_set.get(book=books[0]).quantity == 5
+
+    assert len(many_lines) == len(one_line)
+
+
+@pytest.mark.django_db
+def test_create_with_items_locks_books_in_id_order():
+    rows = [{"book_id": 2, "quantity": 1}, {"book_id": 1, "quantity": 1}]
+    with CaptureQueriesContext(connection) as queries:
+        Order.objects.create_with_items(User.objects.first(), rows)
+
+    book_queries = [
+        query["sql"]
+        for query in queries
+        if query["sql"].startswith("SELECT") and 'FROM "book_book"' in query["sql"]
+    ]
+    assert len(book_queries) == 1
+    assert book_queries[0].endswith('ORDER BY "book_book"."id" ASC')
+
+
+@pytest.mark.django_db
+def test_orders_post_not_enough_books_across_lines(api_client):
+    orders_count = Order.objects.count()
+    body = {"books": [{"book_id": 1, "quantity": 6}, {"book_id": 1, "quantity": 5}]}
+    response = api_client.post("/api/v2/orders/", data=body, format="json")
+    assert response.status_code == 406
+    assert response.json() == {
+        "Error": "There are not enough books with id 1 in stock to create an order"
+    }
+    assert Order.objects.count() == orders_count
+
+
+@pytest.mark.django_db
+def test_orders_post_creates_invoice_in_background(api_client, mono_stub):
+    body = {"books": [{"book_id": 1, "quantity": 2}, {"book_id": 2, "quantity": 1}]}
+    response = api_client.post("/api/v2/orders/", data=body, format="json")
+    assert response.status_code == 202
+    order_id = response.json()["order_id"]
+    invoice_url = f"/api/v2/orders/{order_id}/invoice/"
+    assert response.json() == {
+        "order_id": order_id,
+        "status": "pending_invoice",
+        "pageUrl": None,
+        "invoice_url": invoice_url,
+    }
+    assert mono_stub.calls == []
+
+    call_command("process_invoice_outbox", "--once")
+
+    response = api_client.get(invoice_url)
+    assert response.status_code == 200
+    assert response.json() == {
+        "order_id": order_id,
+        "status": "created",
+        "pageUrl": f"{mono_stub.url}/pay/stub1",
+        "invoice_url": invoice_url,
+    }
+    invoice_request = mono_stub.calls[0][2]
+    assert invoice_request["amount"] == 40000
+    assert invoice_request["merchantPaymInfo"]["reference"] == str(order_id)
+    assert invoice_request["webHookUrl"] == (
+        "http://testserver/api/v2/monobank/callback"
+    )
+    assert InvoiceOutbox.objects.get(order_id=order_id).status == "done"
+
+
+@pytest.mark.django_db
+def test_invoice_outbox_retries_with_backoff(api_client, mono_stub, settings):
+    settings.INVOICE_OUTBOX_MAX_ATTEMPTS = 3
+    mono_stub.failures = 3
+    body = {"books": [{"book_id": 1, "quantity": 1}]}
+    order_id = api_client.post("/api/v2/orders/", data=body, format="json").json()[
+        "order_id"
+    ]
+    outbox = InvoiceOutbox.objects.filter(order_id=order_id)
+
+    call_command("process_invoice_outbox", "--once")
+    entry = outbox.get()
+    assert (entry.status, entry.attempts) == ("pending", 1)
+    assert entry.next_attempt_at > timezone.now()
+    assert "500" in entry.last_error
+
+    call_command("process_invoice_outbox", "--once")
+    assert outbox.get().attempts == 1
+
+    for attempts in (2, 3):
+        outbox.update(next_attempt_at=timezone.now())
+        call_command("process_invoice_outbox", "--once")
+        assert outbox.get().attempts == attempts
+
+    assert outbox.get().status == "failed"
+    response = api_client.get(f"/api/v2/orders/{order_id}/invoice/")
+    assert response.json()["status"] == "invoice_failed"
+    assert len(mono_stub.calls) == 3
+
+
+@pytest.mark.django_db
+def test_invoice_outbox_recovers_after_failure(api_client, mono_stub):
+    mono_stub.failures = 1
+    body = {"books": [{"book_id": 1, "quantity": 1}]}
+    order_id = api_client.post("/api/v2/orders/", data=body, format="json").json()[
+        "order_id"
+    ]
+    call_command("process_invoice_outbox", "--once")
+    InvoiceOutbox.objects.update(next_attempt_at=timezone.now())
+    call_command("process_invoice_outbox", "--once")
+
+    order = Order.objects.get(id=order_id)
+    assert (order.status, order.invoice_id) == ("created", "stub1")
+
+
 @pytest.mark.django_db
 def test_orders_post_invalid_book_not_found(api_client):
     body = {"books": [{"book_id": 10, "quantity": 2}]}
@@ -957,3 +2082,112 @@ def test_orders_id_delete_invalid_id(api_client_is_staff):
     expected_response = {"Error": f"Order with id=10 not found"}
     assert response.status_code == 404
     assert response_body == expected_response
+
+
+@pytest.mark.django_db
+def test_mono_callback_reuses_public_key(mono_stub):
+    response = post_mono_callback(mono_stub)
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+    response = post_mono_callback(mono_stub)
+    assert response.status_code == 200
+
+    assert Order.objects.get(id=1).status == "processing"
+    assert len(mono_stub.calls) == 1
+
+
+@pytest.mark.django_db
+def test_mono_callback_public_key_is_shared_through_cache(mono_stub):
+    post_mono_callback(mono_stub)
+    mono.verifying_key.update(pub_key=None, key=None, refreshed_at=0.0)
+
+    response = post_mono_callback(mono_stub)
+    assert response.status_code == 200
+    assert len(mono_stub.calls) == 1
+
+
+@pytest.mark.django_db
+def test_mono_callback_refreshes_rotated_public_key(mono_stub):
+    post_mono_callback(mono_stub)
+    mono.verifying_key["refreshed_at"] = 0.0
+    mono_stub.rotate_key()
+
+    response = post_mono_callback(mono_stub)
+    assert response.status_code == 200
+    assert len(mono_stub.calls) == 2
+
+
+@pytest.mark.django_db
+def test_mono_callback_invalid_signature(mono_stub):
+    for _ in range(3):
+        response = post_mono_callback(mono_stub, sign=False)
+        assert response.status_code == 400
+        assert response.json() == {"status": "signature mismatch"}
+
+    assert Order.objects.get(id=1).status == "created"
+    assert len(mono_stub.calls) == 1
+
+
+@pytest.mark.django_db
+def test_mono_success_callback_decrements_stock_once(mono_stub):
+    OrderItem.objects.filter(id=1).update(quantity=3)
+
+    for _ in range(2):
+        response = post_mono_callback(mono_stub, status="success")
+        assert response.status_code == 200
+    response = post_mono_callback(mono_stub, status="processing")
+    assert response.status_code == 200
+    response = post_mono_callback(mono_stub, status="success")
+    assert response.status_code == 200
+
+    assert Order.objects.get(id=1).status == "success"
+    assert Book.objects.get(id=1).count == 7
+
+
+@pytest.mark.django_db
+def test_mono_success_redelivered_after_other_statuses_decrements_stock_once(
+    mono_stub,
+):
+    counts = []
+    for callback_status in ["success", "reversed", "success", "failure", "success"]:
+        response = post_mono_callback(mono_stub, status=callback_status)
+        assert response.status_code == 200
+        counts.append(Book.objects.get(id=1).count)
+
+    assert counts == [9, 9, 9, 9, 9]
+    order = Order.objects.get(id=1)
+    assert order.status == "reversed"
+    assert order.stock_decremented_at is not None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("final_status", ["reversed", "failure", "expired"])
+def test_mono_late_callbacks_keep_final_status(mono_stub, final_status):
+    for callback_status in ["created", final_status, "processing", "success", "hold"]:
+        response = post_mono_callback(mono_stub, status=callback_status)
+        assert response.status_code == 200
+
+    assert Order.objects.get(id=1).status == final_status
+    assert Book.objects.get(id=1).count == 10
+
+
+@pytest.mark.django_db(transaction=True)
+def test_mono_parallel_success_callbacks_decrement_stock_once(mono_stub):
+    call_command("loaddata", "db_init.yaml")
+    OrderItem.objects.filter(id=1).update(quantity=3)
+    mono.get_verifying_key()
+    barrier = threading.Barrier(8)
+
+    def send_callback(_):
+        barrier.wait()
+        try:
+            return post_mono_callback(mono_stub, status="success").status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        statuses = list(executor.map(send_callback, range(8)))
+
+    assert statuses == [200] * 8
+    assert Order.objects.get(id=1).status == "success"
+    assert Book.objects.get(id=1).count == 7
@@ -7,12 +7,14 @@ from rest_framework_simplejwt.views import (
 )
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (
     BookViewSet,
     AuthorViewSet,
     UserViewSet,
     OrderView,
     OrderIdView,
+    OrderInvoiceView,
     OrderCallbackView,
 )
 
@@ -26,8 +28,27 @@ urlpatterns = [
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/token/verify/", TokenVerifyView.as_view(), name="token_verify"),
+    path("async/books/", async_views.book_list, name="async_book_list"),
+    path("async/books/search/", async_views.book_search, name="async_book_search"),
+    path("async/books/<int:pk>/", async_views.book_detail, name="async_book_detail"),
+    path("async/authors/", async_views.author_list, name="async_author_list"),
+    path(
+        "async/authors/search/",
+        async_views.author_search,
+        name="async_author_search",
+    ),
+    path(
+        "async/authors/<int:pk>/",
+        async_views.author_detail,
+        name="async_author_detail",
+    ),
     path("", include(router.urls)),
     path("orders/", csrf_exempt(OrderView.as_view()), name="all_orders"),
     path("orders/<int:order_id>/", csrf_exempt(OrderIdView.as_view())),
+    path(
+        "orders/<int:order_id>/invoice/",
+        OrderInvoiceView.as_view(),
+        name="order_invoice",
+    ),
     path("monobank/callback", OrderCallbackView.as_view(), name="mono_callback"),
 ]
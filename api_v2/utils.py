@@ -0,0 +1,7 @@
+from itertools import islice
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
@@ -1,18 +1,31 @@
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.http import JsonResponse
 from django.urls import reverse
 from django.utils import timezone
-
-# from django.utils.decorators import method_decorator
-# from django.views.decorators.cache import cache_page
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, filters
+from requests import RequestException
+from rest_framework import generics, viewsets, filters
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 
+from .authentication import ReadOnlyTokenUserAuthentication
+from .bulk import AuthorBulkWriter, BookBulkWriter, BulkMixin
+from .cache import bump_version, versioned_cache
+from .export import EXPORT_FORMATS, export_books
+from .filters import AuthorFilter, BookFilter, OrderFilter
+from .pagination import (
+    AuthorPagination,
+    BookPagination,
+    OrderPagination,
+    SearchPagination,
+)
 from .permissions import UserPermissions
+from .search import search_authors, search_books
 from .serializers import (
     AuthorSerializer,
     BookSerializer,
@@ -22,17 +35,30 @@ from .serializers import (
 )
 from author.models import Author
 from book.models import Book
-from order.models import Order, OrderItem
-from order.mono import verify_signature, create_mono_order, get_mono_token
+from order.models import (
+    FINAL_STATUSES,
+    Order,
+    OrderError,
+    BookNotFound,
+    NotEnoughBooks,
+    InvalidQuantity,
+)
+from order.mono import verify_callback_signature
+from order.outbox import enqueue_invoice
 
 
-# @method_decorator(cache_page(60 * 5), name="list")
-class BookViewSet(viewsets.ModelViewSet):
+@method_decorator(versioned_cache("book", "author"), name="list")
+@method_decorator(versioned_cache("book", "author"), name="retrieve")
+@method_decorator(versioned_cache("book", "author"), name="search")
+class BookViewSet(BulkMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    bulk_writer_class = BookBulkWriter
+    authentication_classes = [ReadOnlyTokenUserAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = BookPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ["name", "genre", "authors"]
+    filterset_class = BookFilter
     ordering_fields = ["publication_date"]
 
     def list(self, request, *args, **kwargs):
@@ -40,19 +66,37 @@ class BookViewSet(viewsets.ModelViewSet):
 
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            books = []
-            for item in serializer.data:
-                book = Book.objects.get(id=item["id"])
-                books.append(book.get_info())
-            return self.get_paginated_response(books)
-
-        serializer = self.get_serializer(queryset, many=True)
-        books = []
-        for item in serializer.data:
-            book = Book.objects.get(id=item["id"])
-            books.append(book.get_info())
-        return Response(books)
+            return self.get_paginated_response(Book.get_info_list(page))
+
+        return Response(Book.get_info_list(queryset))
+
+    @action(detail=False, pagination_class=SearchPagination)
+    def search(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"q": ["This query parameter is required."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        books = search_books(query)
+        page = self.paginate_queryset(books)
+        if page is not None:
+            return self.get_paginated_response(Book.get_info_list(page))
+
+        return Response(Book.get_info_list(books))
+
+    @action(detail=False)
+    def export(self, request):
+        # "format" is DRF's renderer override, hence "output".
+        output = request.query_params.get("output", "jsonl")
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"output": [f'"{output}" is not a valid choice.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_books(queryset.defer("search_vector"), output)
 
     def retrieve(self, request, *args, **kwargs):
         book = self.get_object()
@@ -63,9 +107,10 @@ class BookViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
-        book = Book.objects.get(pk=serializer.data["id"])
         return Response(
-            book.get_info(), status=status.HTTP_201_CREATED, headers=headers
+            serializer.instance.get_info(),
+            status=status.HTTP_201_CREATED,
+            headers=headers,
         )
 
     def update(self, request, *args, **kwargs):
@@ -77,12 +122,35 @@ class BookViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-# @method_decorator(cache_page(60 * 5), name="list")
-class AuthorViewSet(viewsets.ModelViewSet):
+@method_decorator(versioned_cache("author"), name="list")
+@method_decorator(versioned_cache("author"), name="retrieve")
+@method_decorator(versioned_cache("author"), name="search")
+class AuthorViewSet(BulkMixin, viewsets.ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    bulk_writer_class = AuthorBulkWriter
+    authentication_classes = [ReadOnlyTokenUserAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filterset_fields = ["first_name"]
+    pagination_class = AuthorPagination
+    filterset_class = AuthorFilter
+
+    @action(detail=False, pagination_class=SearchPagination)
+    def search(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"q": ["This query parameter is required."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        authors = search_authors(query)
+        page = self.paginate_queryset(authors)
+        if page is not None:
+            return self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            )
+
+        return Response(self.get_serializer(authors, many=True).data)
 
     def update(self, request, *args, **kwargs):
         author = self.get_object()
@@ -102,70 +170,55 @@ class UserViewSet(viewsets.ModelViewSet):
     pagination_class = None
 
 
-class OrderView(APIView):
+class OrderView(generics.GenericAPIView):
+    queryset = Order.objects.with_items()
+    authentication_classes = [ReadOnlyTokenUserAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = OrderPagination
+    filterset_class = OrderFilter
+    error_statuses = {
+        BookNotFound: status.HTTP_404_NOT_FOUND,
+        NotEnoughBooks: status.HTTP_406_NOT_ACCEPTABLE,
+        InvalidQuantity: status.HTTP_400_BAD_REQUEST,
+    }
 
     def get(self, request):
-        orders = [order.get_info() for order in Order.objects.all().order_by("-id")]
-        return Response(orders)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response([order.get_info() for order in page])
 
     def post(self, request):
         serializer = OrderSerializer(data=request.data)
-        if serializer.is_valid():
-            order = Order(
-                user=request.user, status="created", created_at=timezone.now()
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        if not serializer.data["books"]:
+            return Response(
+                {"books": ["This field is required."]},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            order.save()
-
-            if serializer.data["books"]:
-                for row in serializer.data["books"]:
-                    book_id = row["book_id"]
-                    try:
-                        book = Book.objects.get(pk=book_id)
-                    except Book.DoesNotExist:
-                        order.delete()
-                        return Response(
-                            {"Error": f"Book with id {book_id} not found"},
-                            status=status.HTTP_404_NOT_FOUND,
-                        )
-                    quantity = row["quantity"]
-                    if book.count < quantity:
-                        order.delete()
-                        return Response(
-                            {
-                                "Error": f"There are not enough books with id {book_id} in stock to create an order"
-                            },
-                            status=status.HTTP_406_NOT_ACCEPTABLE,
-                        )
-                    if quantity > 0:
-                        order_item = OrderItem(
-                            order=order, book=book, quantity=quantity
-                        )
-                        order_item.save()
-                    else:
-                        order.delete()
-                        return Response(
-                            {"Error": "Quantity must be more that 0"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                webhook_url = request.build_absolute_uri(reverse("mono_callback"))
-                response = create_mono_order(order, webhook_url)
-                return Response(response)
-            else:
-                order.delete()
-                return Response(
-                    {"books": ["This field is required."]},
-                    status=status.HTTP_400_BAD_REQUEST,
+
+        webhook_url = request.build_absolute_uri(reverse("mono_callback"))
+        try:
+            with transaction.atomic():
+                order = Order.objects.create_with_items(
+                    request.user, serializer.data["books"], status="pending_invoice"
                 )
-        return JsonResponse(serializer.errors, status=400)
+                enqueue_invoice(order, webhook_url)
+        except OrderError as exc:
+            return Response({"Error": str(exc)}, status=self.error_statuses[type(exc)])
+        return Response(
+            OrderInvoiceView.get_invoice_info(order),
+            status=status.HTTP_202_ACCEPTED,
+        )
 
 
 class OrderIdView(APIView):
+    authentication_classes = [ReadOnlyTokenUserAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get(self, request, order_id):
         try:
-            order = Order.objects.get(id=order_id)
+            order = Order.objects.with_items().get(id=order_id)
             return JsonResponse(order.get_info(), safe=False)
         except Order.DoesNotExist:
             return JsonResponse(
@@ -185,14 +238,41 @@ class OrderIdView(APIView):
             )
 
 
+class OrderInvoiceView(APIView):
+    authentication_classes = [ReadOnlyTokenUserAuthentication]
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    @staticmethod
+    def get_invoice_info(order):
+        return {
+            "order_id": order.id,
+            "status": order.status,
+            "pageUrl": order.pay_url,
+            "invoice_url": reverse("order_invoice", args=[order.id]),
+        }
+
+    def get(self, request, order_id):
+        try:
+            order = Order.objects.get(id=order_id)
+        except Order.DoesNotExist:
+            return JsonResponse(
+                {"Error": f"Order with id={order_id} not found"}, status=404
+            )
+        return Response(self.get_invoice_info(order))
+
+
 class OrderCallbackView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
-        public_key = get_mono_token()
-        if not verify_signature(
-            public_key, request.headers.get("X-Sign"), request.body
-        ):
+        try:
+            verified = verify_callback_signature(
+                request.headers.get("X-Sign"), request.body
+            )
+        except RequestException:
+            # Monobank retries webhooks that do not succeed.
+            return Response({"status": "public key unavailable"}, status=503)
+        if not verified:
             return Response({"status": "signature mismatch"}, status=400)
         callback = MonoCallbackSerializer(data=request.data)
         callback.is_valid(raise_exception=True)
@@ -203,11 +283,26 @@ class OrderCallbackView(APIView):
         if order.invoice_id != callback.validated_data["invoiceId"]:
             return Response({"status": "invoiceId mismatch"}, status=400)
         callback_status = callback.validated_data["status"]
-        if callback_status == "success" and order.status != "success":
-            for item in OrderItem.objects.filter(order_id=order.id):
-                book = Book.objects.get(pk=item.book_id)
-                book.count -= 1
-                book.save()
-        order.status = callback_status
-        order.save()
+        orders = Order.objects.filter(
+            id=order.id, invoice_id=callback.validated_data["invoiceId"]
+        )
+        if callback_status in ("created", "processing", "hold", "success"):
+            # Late or repeated webhooks must not move a paid, refunded or
+            # failed order back or take its books out of stock twice.
+            orders = orders.exclude(status__in=["success", *FINAL_STATUSES])
+        else:
+            # Only a success can still end differently, e.g. be reversed.
+            orders = orders.exclude(status__in=FINAL_STATUSES)
+        with transaction.atomic():
+            updated = orders.update(status=callback_status)
+            if callback_status == "success" and updated:
+                # Only the callback that stamps the order takes its books.
+                taken = Order.objects.filter(
+                    id=order.id,
+                    invoice_id=callback.validated_data["invoiceId"],
+                    stock_decremented_at__isnull=True,
+                ).update(stock_decremented_at=timezone.now())
+                if taken:
+                    order.decrement_stock()
+                    bump_version("book")
         return Response({"status": "ok"})
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.2 on 2026-10-18 05:02
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+FIELDS = ["first_name", "last_name", "patronymic"]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in FIELDS:
+        schema_editor.execute(
+            f"CREATE INDEX author_author_{field}_trgm "
+            f"ON author_author USING gin ({field} gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in FIELDS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS author_author_{field}_trgm")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("author", "0002_alter_author_id"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
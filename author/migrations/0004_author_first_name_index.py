@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("author", "0003_author_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="author",
+            index=models.Index(
+                fields=["first_name"], name="author_auth_first_n_87f383_idx"
+            ),
+        ),
+    ]
@@ -8,6 +8,9 @@ class Author(models.Model):
     patronymic = models.CharField(blank=True, max_length=20)
     birthday = models.DateField()
 
+    class Meta:
+        indexes = [models.Index(fields=["first_name"])]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} {self.patronymic}"
 
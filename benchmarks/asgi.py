@@ -0,0 +1,149 @@
+"""
+Compares catalogue throughput of the WSGI deployment (gunicorn sync workers,
+DRF views) with the ASGI one (gunicorn uvicorn workers, async views) when
+many clients are slow to send their requests.
+
+    python -m benchmarks.asgi --workers 2 --clients 200 --client-delay 0.5
+
+Each client opens a connection, trickles its request out over
+--client-delay seconds, reads the response and starts over. A sync worker
+that has accepted such a connection blocks until the request is complete;
+an event loop keeps serving other connections meanwhile.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+from .utils import percentile, print_table
+
+MODES = {
+    "wsgi": (["book_store.wsgi"], "/api/v2/books/"),
+    "asgi": (
+        ["book_store.asgi:application", "-k", "uvicorn.workers.UvicornWorker"],
+        "/api/v2/async/books/",
+    ),
+}
+
+
+async def slow_client(port, path, delay, deadline, results):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n"
+            request += "Accept: application/json\r\nConnection: close\r\n\r\n"
+            chunks = [request[i : i + 8] for i in range(0, len(request), 8)]
+            for chunk in chunks:
+                writer.write(chunk.encode())
+                await writer.drain()
+                await asyncio.sleep(delay / len(chunks))
+            status_line = await reader.readline()
+            await reader.read()
+            writer.close()
+            ok = status_line.split()[1:2] == [b"200"]
+        except (OSError, IndexError):
+            ok = False
+        results.append(((time.perf_counter() - start) * 1000, ok))
+
+
+async def run_clients(port, path, clients, delay, duration):
+    results = []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(
+        *(slow_client(port, path, delay, deadline, results) for _ in range(clients))
+    )
+    return results
+
+
+def start_server(mode, args, env):
+    target, path = MODES[mode]
+    server = subprocess.Popen(
+        [
+            "gunicorn",
+            *target,
+            "--workers",
+            str(args.workers),
+            "--bind",
+            f"127.0.0.1:{args.port}",
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://localhost:{args.port}{path}", timeout=5)
+            return server
+        except requests.RequestException:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--client-delay", type=float, default=0.5)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--settings", default="book_store.test_settings")
+    parser.add_argument(
+        "--seed-books", type=int, default=0, help="Run seed_store with this many books"
+    )
+    parser.add_argument("--mode", choices=list(MODES), action="append", dest="modes")
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=args.settings,
+        REQUEST_METRICS_SAMPLE_RATE="0",
+    )
+    manage = [sys.executable, "manage.py"]
+    subprocess.run([*manage, "migrate", "-v", "0"], env=env, check=True)
+    if args.seed_books:
+        subprocess.run(
+            [*manage, "seed_store", "--books", str(args.seed_books)],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    rows = []
+    for mode in args.modes or list(MODES):
+        server = start_server(mode, args, env)
+        try:
+            results = asyncio.run(
+                run_clients(
+                    args.port,
+                    MODES[mode][1],
+                    args.clients,
+                    args.client_delay,
+                    args.duration,
+                )
+            )
+        finally:
+            server.terminate()
+            server.wait()
+        latencies = [latency for latency, ok in results if ok]
+        errors = len(results) - len(latencies)
+        rows.append(
+            [
+                mode,
+                len(latencies),
+                round(len(latencies) / args.duration, 1),
+                round(errors / max(len(results), 1), 4),
+                round(percentile(latencies, 50), 1) if latencies else "-",
+                round(percentile(latencies, 95), 1) if latencies else "-",
+            ]
+        )
+    print_table(["mode", "requests", "rps", "error_rate", "p50_ms", "p95_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
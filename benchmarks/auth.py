@@ -0,0 +1,66 @@
+"""
+Compares the per-request cost of resolving the JWT user with simplejwt's
+JWTAuthentication (one query per request), CachedJWTAuthentication from the
+per-process cache and from Redis, and the TokenUser built from the claims
+for safe methods.
+
+    python -m benchmarks.auth --repeat 2000
+"""
+import argparse
+
+from .utils import measure, print_table, setup_django, test_database
+
+
+def get_cases():
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api_v2.authentication import (
+        CachedJWTAuthentication,
+        ReadOnlyTokenUserAuthentication,
+        clear_local_users,
+    )
+
+    user = User.objects.create_user(username="benchmark", password="benchmark")
+    header = f"Bearer {RefreshToken.for_user(user).access_token}"
+    factory = APIRequestFactory()
+    get = factory.get("/", HTTP_AUTHORIZATION=header)
+    post = factory.post("/", HTTP_AUTHORIZATION=header)
+
+    database = JWTAuthentication()
+    cached = CachedJWTAuthentication()
+    read_only = ReadOnlyTokenUserAuthentication()
+    cached.authenticate(post)
+    return {
+        "database": (lambda: database.authenticate(post), None),
+        "cached.local": (lambda: cached.authenticate(post), None),
+        "cached.redis": (lambda: cached.authenticate(post), clear_local_users),
+        "token_user": (lambda: read_only.authenticate(get), None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    rows = []
+    with test_database():
+        for name, (authenticate, setup) in get_cases().items():
+            stats = measure(authenticate, args.repeat, setup=setup)
+            rows.append(
+                [
+                    name,
+                    stats["queries"],
+                    round(stats["p50_ms"] * 1000),
+                    round(stats["p95_ms"] * 1000),
+                ]
+            )
+    print_table(["path", "queries", "p50 us", "p95 us"], rows)
+
+
+if __name__ == "__main__":
+    main()
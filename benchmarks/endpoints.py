@@ -0,0 +1,150 @@
+"""
+Measures latency, queries per request and peak allocated memory of the hot
+v2 endpoints on a seeded test database, and fails on regressions against
+the stored baseline. Response caches are cleared before every request, so
+the numbers are for the uncached path. Query counts must not grow at all;
+latency and memory may grow by --threshold. Baselines are per machine, so
+regenerate them with --update-baseline when moving to new hardware.
+
+    python -m benchmarks.endpoints --repeat 50
+    python -m benchmarks.endpoints --update-baseline
+"""
+import argparse
+import io
+import json
+import sys
+
+from .utils import (
+    find_regressions,
+    load_baseline,
+    measure,
+    print_table,
+    save_baseline,
+    setup_django,
+    test_database,
+)
+
+BASELINE = "endpoints"
+METRICS = ["queries", "p50_ms", "p95_ms", "peak_kb"]
+
+
+def seed(scale):
+    from django.core.management import call_command
+
+    call_command(
+        "seed_store",
+        authors=scale // 10,
+        books=scale,
+        users=scale // 100,
+        orders=scale,
+        stdout=io.StringIO(),
+    )
+
+
+def get_cases(stub):
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from author.models import Author
+    from book.models import Book
+    from order.models import Order
+
+    user = User.objects.create_user(username="benchmark", password="benchmark")
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}"
+    )
+
+    book = Book.objects.filter(count__gte=100).order_by("id").first()
+    author = Author.objects.order_by("id").first()
+    order = Order.objects.order_by("-id").first()
+    Order.objects.filter(pk=order.pk).update(invoice_id="benchmark")
+    order_body = {"books": [{"book_id": book.id, "quantity": 1}]}
+    callback = json.dumps(
+        {
+            "invoiceId": "benchmark",
+            "status": "processing",
+            "amount": 1000,
+            "ccy": 980,
+            "reference": str(order.id),
+        }
+    ).encode()
+    sign = stub.sign(callback)
+
+    return {
+        "books.list": lambda: client.get("/api/v2/books/"),
+        "books.retrieve": lambda: client.get(f"/api/v2/books/{book.id}/"),
+        "authors.list": lambda: client.get("/api/v2/authors/"),
+        "orders.get": lambda: client.get("/api/v2/orders/"),
+        "orders.post": lambda: client.post(
+            "/api/v2/orders/", order_body, format="json"
+        ),
+        "orders.id.get": lambda: client.get(f"/api/v2/orders/{order.id}/"),
+        "monobank.callback": lambda: client.post(
+            "/api/v2/monobank/callback",
+            data=callback,
+            content_type="application/json",
+            HTTP_X_SIGN=sign,
+        ),
+    }
+
+
+def run(repeat, scale, cases):
+    from django.conf import settings
+    from django.core.cache import cache
+
+    from order.monobank_stub import MonobankStub
+
+    seed(scale)
+    results = {}
+    with MonobankStub() as stub:
+        settings.MONOBANK_API_URL = stub.url
+        for name, request in get_cases(stub).items():
+            if cases and name not in cases:
+                continue
+            response = request()
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name} returned {response.status_code}")
+            results[name] = measure(request, repeat, setup=cache.clear)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--scale", type=int, default=2000, help="Books and orders")
+    parser.add_argument("--case", action="append", dest="cases")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="Allowed relative growth of latency and memory",
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        results = run(args.repeat, args.scale, args.cases)
+
+    print_table(
+        ["endpoint", *METRICS],
+        [
+            [name, *(stats[metric] for metric in METRICS)]
+            for name, stats in results.items()
+        ],
+    )
+    if args.update_baseline:
+        save_baseline(BASELINE, {**load_baseline(BASELINE), **results})
+        return
+
+    regressions = find_regressions(results, load_baseline(BASELINE), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
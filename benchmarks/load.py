@@ -0,0 +1,305 @@
+"""
+Load test for the v2 API: many virtual users replay the e2e_tests journeys
+(register, token, create author and book, order, pay) and browse the
+catalogue with a weighted mix, against a local server whose Monobank is a
+local stub. Reports throughput, latency percentiles and histograms and error
+rates per endpoint.
+
+    python -m benchmarks.load --start-server --workers 4 --users 50 --duration 60
+
+--start-server migrates the database of the given --settings and runs
+gunicorn and the invoice outbox worker against a Monobank stub. Size workers
+on Postgres (docker compose up db redis): SQLite serialises every write.
+Without --start-server the API at --api-url is used as is; point its
+MONOBANK_API_URL at a stub of its own or payments will not complete.
+"""
+import argparse
+import bisect
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+from .utils import percentile, print_table
+
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, name, elapsed_ms, ok):
+        with self.lock:
+            self.latencies[name].append(elapsed_ms)
+            if not ok:
+                self.errors[name] += 1
+
+    def get_histogram(self, name):
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for latency in self.latencies[name]:
+            counts[bisect.bisect_left(BUCKETS_MS, latency)] += 1
+        labels = [f"<={bucket}ms" for bucket in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return dict(zip(labels, counts))
+
+    def get_report(self, duration):
+        report = {}
+        for name, latencies in sorted(self.latencies.items()):
+            report[name] = {
+                "requests": len(latencies),
+                "rps": round(len(latencies) / duration, 2),
+                "error_rate": round(self.errors[name] / len(latencies), 4),
+                "p50_ms": round(statistics.median(latencies), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "histogram": self.get_histogram(name),
+            }
+        return report
+
+
+class VirtualUser:
+    def __init__(self, api_url, stats, stub, rng):
+        self.api_url = api_url
+        self.stats = stats
+        self.stub = stub
+        self.rng = rng
+        self.session = requests.Session()
+        self.book_ids = []
+
+    def request(self, name, method, path, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.api_url + path, timeout=30, **kwargs
+            )
+        except requests.RequestException:
+            self.stats.add(name, (time.perf_counter() - start) * 1000, False)
+            return None
+        ok = response.status_code in expected
+        self.stats.add(name, (time.perf_counter() - start) * 1000, ok)
+        return response if ok else None
+
+    # Same steps as test_users_post_valid and test_users_get_token_valid.
+    def register(self):
+        credentials = {
+            "username": f"load_{uuid.uuid4().hex[:12]}",
+            "password": "random1!",
+        }
+        if self.request("POST users/", "POST", "users/", (201,), json=credentials):
+            response = self.request("POST token/", "POST", "token/", json=credentials)
+            if response is not None:
+                token = response.json()["access"]
+                self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def browse(self):
+        response = self.request("GET books/", "GET", "books/")
+        if response is not None:
+            self.book_ids = [book["id"] for book in response.json()["results"]]
+        if self.book_ids:
+            book_id = self.rng.choice(self.book_ids)
+            self.request("GET books/{id}/", "GET", f"books/{book_id}/")
+        self.request("GET authors/", "GET", "authors/")
+        self.request("GET books/search/", "GET", "books/search/", params={"q": "a"})
+
+    # Same steps as test_authors_post_valid and test_books_post_valid.
+    def publish(self):
+        author = self.request(
+            "POST authors/",
+            "POST",
+            "authors/",
+            (201,),
+            json={
+                "first_name": "Load",
+                "last_name": "Test",
+                "patronymic": "Author",
+                "birthday": "1990-01-01",
+            },
+        )
+        if author is None:
+            return
+        book = self.request(
+            "POST books/",
+            "POST",
+            "books/",
+            (201,),
+            json={
+                "name": f"Load test {uuid.uuid4().hex[:8]}",
+                "authors": [author.json()["id"]],
+                "genre": "load",
+                "publication_date": "2000-01-01",
+                "count": 10**6,
+            },
+        )
+        if book is not None:
+            self.book_ids.append(book.json()["id"])
+
+    # Same steps as test_orders_post_valid_one_book, then pays the invoice.
+    def order(self):
+        if not self.book_ids:
+            return self.publish()
+        book_id = self.rng.choice(self.book_ids)
+        response = self.request(
+            "POST orders/",
+            "POST",
+            "orders/",
+            (202, 406),
+            json={"books": [{"book_id": book_id, "quantity": 1}]},
+        )
+        if response is None or response.status_code != 202:
+            return
+        order_id = response.json()["order_id"]
+        for _ in range(20):
+            invoice = self.request(
+                "GET orders/{id}/invoice/", "GET", f"orders/{order_id}/invoice/"
+            )
+            if invoice is None:
+                return
+            if invoice.json()["pageUrl"]:
+                return self.pay(order_id, invoice.json()["pageUrl"])
+            time.sleep(0.25)
+
+    def pay(self, order_id, page_url):
+        body = json.dumps(
+            {
+                "invoiceId": page_url.rsplit("/", 1)[-1],
+                "status": "success",
+                "amount": 0,
+                "ccy": 980,
+                "reference": str(order_id),
+            }
+        ).encode()
+        self.request(
+            "POST monobank/callback",
+            "POST",
+            "monobank/callback",
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Sign": self.stub.sign(body),
+            },
+        )
+
+    def run(self, scenarios, deadline):
+        self.register()
+        names = list(scenarios)
+        weights = [scenarios[name] for name in names]
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(names, weights)[0])()
+            time.sleep(self.rng.uniform(0, 0.1))
+
+
+def start_server(args, stub):
+    env = dict(os.environ, MONOBANK_API_URL=stub.url)
+    if args.settings:
+        env["DJANGO_SETTINGS_MODULE"] = args.settings
+    subprocess.run(
+        [sys.executable, "manage.py", "migrate", "-v", "0"], env=env, check=True
+    )
+    server = subprocess.Popen(
+        [
+            "gunicorn",
+            "book_store.wsgi",
+            "--workers",
+            str(args.workers),
+            "--bind",
+            f"127.0.0.1:{args.port}",
+        ],
+        env=env,
+    )
+    worker = subprocess.Popen(
+        [sys.executable, "manage.py", "process_invoice_outbox", "--interval", "0.2"],
+        env=env,
+    )
+    processes = [server, worker]
+    for _ in range(100):
+        try:
+            requests.get(args.api_url + "books/", timeout=5)
+            return processes
+        except requests.RequestException:
+            time.sleep(0.1)
+    stop_processes(processes)
+    raise RuntimeError(f"{args.api_url} did not start")
+
+
+def stop_processes(processes):
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000/api/v2/")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--ramp-up", type=float, default=5)
+    parser.add_argument("--browse-weight", type=int, default=6)
+    parser.add_argument("--order-weight", type=int, default=3)
+    parser.add_argument("--publish-weight", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start-server", action="store_true")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--settings", help="DJANGO_SETTINGS_MODULE for the server")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    from order.monobank_stub import MonobankStub
+
+    scenarios = {
+        "browse": args.browse_weight,
+        "order": args.order_weight,
+        "publish": args.publish_weight,
+    }
+    stats = Stats()
+    with MonobankStub() as stub:
+        processes = []
+        if args.start_server:
+            args.api_url = f"http://127.0.0.1:{args.port}/api/v2/"
+            processes = start_server(args, stub)
+        try:
+            start = time.monotonic()
+            deadline = start + args.duration
+            threads = []
+            for i in range(args.users):
+                user = VirtualUser(
+                    args.api_url, stats, stub, random.Random(args.seed + i)
+                )
+                thread = threading.Thread(target=user.run, args=(scenarios, deadline))
+                thread.start()
+                threads.append(thread)
+                time.sleep(args.ramp_up / args.users)
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - start
+        finally:
+            stop_processes(processes)
+
+    report = stats.get_report(elapsed)
+    columns = ["requests", "rps", "error_rate", "p50_ms", "p95_ms", "p99_ms"]
+    print_table(
+        ["endpoint", *columns],
+        [[name, *(row[column] for column in columns)] for name, row in report.items()],
+    )
+    print()
+    print_table(
+        ["endpoint", *BUCKETS_MS, "more"],
+        [[name, *row["histogram"].values()] for name, row in report.items()],
+    )
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
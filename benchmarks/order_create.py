@@ -0,0 +1,75 @@
+"""
+Compares the query count and latency of order creation with the per-line
+implementation it replaced.
+
+    python -m benchmarks.order_create --lines 1 10 50 --repeat 20
+"""
+import argparse
+
+from .utils import measure, print_table, setup_django, test_database
+
+
+def legacy_create_with_items(user, rows):
+    from django.utils import timezone
+
+    from book.models import Book
+    from order.models import Order, OrderItem
+
+    order = Order(user=user, status="created", created_at=timezone.now())
+    order.save()
+    for row in rows:
+        book = Book.objects.get(pk=row["book_id"])
+        if book.count < row["quantity"] or row["quantity"] <= 0:
+            order.delete()
+            return None
+        OrderItem(order=order, book=book, quantity=row["quantity"]).save()
+    return order
+
+
+def run(lines, repeat):
+    from django.contrib.auth.models import User
+    from django.db import transaction
+
+    from book.models import Book
+    from order.models import Order
+
+    user = User.objects.create_user(username="benchmark", password="benchmark")
+    Book.objects.bulk_create(
+        Book(name=f"book{i}", genre="g", publication_date="2000-01-01", count=10**6)
+        for i in range(max(lines))
+    )
+    book_ids = list(Book.objects.values_list("id", flat=True))
+
+    results = []
+    for count in lines:
+        rows = [{"book_id": book_id, "quantity": 1} for book_id in book_ids[:count]]
+        for name, create in [
+            ("legacy", legacy_create_with_items),
+            ("bulk", Order.objects.create_with_items),
+        ]:
+
+            def create_order():
+                with transaction.atomic():
+                    create(user, rows)
+                    transaction.set_rollback(True)
+
+            stats = measure(create_order, repeat)
+            results.append(
+                [count, name, stats["queries"], stats["p50_ms"], stats["p95_ms"]]
+            )
+    print_table(["lines", "path", "queries", "p50 ms", "p95 ms"], results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.lines, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
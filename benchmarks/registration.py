@@ -0,0 +1,70 @@
+"""
+Measures registrations per second, and per core, through UserSerializer
+with password validation and hashing on the capped pool, against doing both
+on the request threads as before. --threads concurrent "requests" register
+--users users in total.
+
+    python -m benchmarks.registration --threads 8 --users 200
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import print_table, setup_django, test_database
+
+
+def register_inline(username, password):
+    from django.contrib.auth.models import User
+    from django.contrib.auth.password_validation import validate_password
+
+    validate_password(password)
+    User.objects.create_user(username=username, password=password)
+
+
+def register_pooled(username, password):
+    from api_v2.serializers import UserSerializer
+
+    serializer = UserSerializer(data={"username": username, "password": password})
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+
+
+def run(register, prefix, threads, users):
+    from django.db import connection
+
+    def worker(start):
+        try:
+            for i in range(start, users, threads):
+                register(f"{prefix}{i}", f"benchmark-{i}!")
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(worker, range(threads)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    cores = len(os.sched_getaffinity(0))
+    rows = []
+    with test_database():
+        for name, register in [("inline", register_inline), ("pool", register_pooled)]:
+            elapsed = run(register, name, args.threads, args.users)
+            rate = args.users / elapsed
+            rows.append([name, round(rate, 1), round(rate / cores, 1)])
+    print(f"{cores} cores, pool of {settings.PASSWORD_HASHING_WORKERS} threads")
+    print_table(["path", "per second", "per core"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import os
+import pathlib
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+
+BASELINES_DIR = pathlib.Path(__file__).parent / "baselines"
+# Differences below these are noise, whatever the ratio.
+MIN_REGRESSION = {"p50_ms": 2.0, "p95_ms": 5.0, "peak_kb": 64.0}
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "book_store.test_settings")
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, percent):
+    samples = sorted(samples)
+    index = max(0, min(len(samples) - 1, round(percent / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def measure(func, repeat, setup=None):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+
+    # tracemalloc slows every allocation down, so memory gets its own run.
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "queries": max(queries),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def print_table(headers, rows):
+    widths = [
+        max(len(str(value)) for value in column) for column in zip(headers, *rows)
+    ]
+    for row in [headers, *rows]:
+        print("  ".join(str(value).rjust(width) for value, width in zip(row, widths)))
+
+
+def load_baseline(name):
+    path = BASELINES_DIR / f"{name}.json"
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(name, results):
+    BASELINES_DIR.mkdir(exist_ok=True)
+    path = BASELINES_DIR / f"{name}.json"
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for case, stats in results.items():
+        expected = baseline.get(case)
+        if expected is None:
+            continue
+        if stats["queries"] > expected["queries"]:
+            regressions.append(
+                f"{case}: {stats['queries']} queries, baseline {expected['queries']}"
+            )
+        for metric, minimum in MIN_REGRESSION.items():
+            limit = expected[metric] * (1 + threshold)
+            if stats[metric] > limit and stats[metric] - expected[metric] > minimum:
+                regressions.append(
+                    f"{case}: {metric} {stats[metric]}, baseline {expected[metric]}"
+                )
+    return regressions
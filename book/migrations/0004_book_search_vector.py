@@ -0,0 +1,54 @@
+# Generated by Django 4.2.2 on 2026-10-18 04:13
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX book_book_search_vector_gin "
+        "ON book_book USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        """
+        UPDATE book_book SET search_vector =
+            setweight(to_tsvector('simple', book_book.name), 'A')
+            || setweight(to_tsvector('simple', book_book.genre), 'B')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(
+                    author_author.first_name || ' ' || author_author.last_name
+                    || ' ' || author_author.patronymic, ' '
+                )
+                FROM author_author
+                JOIN book_book_authors
+                    ON book_book_authors.author_id = author_author.id
+                WHERE book_book_authors.book_id = book_book.id
+            ), '')), 'C')
+        """
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS book_book_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("book", "0003_book_count_book_price"),
+        ("author", "0002_alter_author_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        # GinIndex in Meta.indexes would break the sqlite test database.
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
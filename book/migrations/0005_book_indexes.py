@@ -0,0 +1,26 @@
+# Generated by Django 4.2.2 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("book", "0004_book_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["name"], name="book_book_name_3b5d59_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["genre"], name="book_book_genre_8d5c56_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["publication_date", "id"], name="book_book_publica_4c3f96_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.2 on 2026-10-18 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("book", "0005_book_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="sku",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
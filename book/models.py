@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from author.models import Author
@@ -11,10 +12,22 @@ class Book(models.Model):
     publication_date = models.DateField()
     price = models.PositiveIntegerField(default=1000)
     count = models.IntegerField(default=0)
+    # Supplier stock-keeping unit, the natural key of import_catalogue.
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Maintained by api_v2.search on Postgres, GIN-indexed in migration 0004.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"]),
+            models.Index(fields=["genre"]),
+            models.Index(fields=["publication_date", "id"]),
+        ]
 
     # @staticmethod
-    def get_info(self):
-        authors = [author.get_full_name() for author in self.authors.select_related()]
+    def get_info(self, authors=None):
+        if authors is None:
+            authors = [author.get_full_name() for author in self.authors.all()]
         book_info = {
             "id": self.id,
             "name": self.name,
@@ -25,3 +38,46 @@ class Book(models.Model):
             "price": self.price,
         }
         return book_info
+
+    @staticmethod
+    def get_author_links(books):
+        return (
+            Book.authors.through.objects.filter(book_id__in=[book.id for book in books])
+            .order_by("id")
+            .values_list("book_id", "author_id")
+        )
+
+    @staticmethod
+    def build_info_list(books, links, authors):
+        book_authors = {book.id: [] for book in books}
+        for book_id, author_id in links:
+            book_authors[book_id].append(author_id)
+        author_names = {author.id: author.get_full_name() for author in authors}
+        return [
+            book.get_info(
+                authors=[author_names[author_id] for author_id in book_authors[book.id]]
+            )
+            for book in books
+        ]
+
+    @staticmethod
+    def get_info_list(books):
+        books = list(books)
+        links = list(Book.get_author_links(books))
+        authors = Author.objects.filter(id__in={author_id for _, author_id in links})
+        return Book.build_info_list(books, links, authors)
+
+    @staticmethod
+    async def aget_info_list(books):
+        links = [link async for link in Book.get_author_links(books)]
+        authors = [
+            author
+            async for author in Author.objects.filter(
+                id__in={author_id for _, author_id in links}
+            )
+        ]
+        return Book.build_info_list(books, links, authors)
+
+    async def aget_info(self):
+        authors = [author.get_full_name() async for author in self.authors.all()]
+        return self.get_info(authors=authors)
@@ -2,6 +2,12 @@
 ASGI config for book_store project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The async catalogue reads under /api/v2/async/ run on the event loop when
+served from here, e.g. with uvicorn workers under gunicorn:
+
+    gunicorn book_store.asgi:application -k uvicorn.workers.UvicornWorker
+
+or, for a single process, ``uvicorn book_store.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -0,0 +1,194 @@
+import bisect
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERY_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576]
+
+# Counters of the request being handled, set by RequestMetricsMiddleware.
+request_counters = ContextVar("request_counters", default=None)
+
+
+def record_cache(event):
+    counters = request_counters.get()
+    if counters is not None:
+        counters[event] += 1
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label(value)}"' for name, value in labels)
+    return f"{{{pairs}}}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = defaultdict(float)
+
+    def inc(self, labels, value=1):
+        self.values[tuple(labels.items())] += value
+
+    def collect(self):
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(labels)} {value}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, labels, value=1):
+        self.values[tuple(labels.items())] -= value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, labels, value):
+        key = tuple(labels.items())
+        if key not in self.values:
+            self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        counts, _ = self.values[key]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.values[key][1] += value
+
+    def collect(self):
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bucket, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                bucket_labels = format_labels((*labels, ("le", bucket)))
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{format_labels(labels)} {total}"
+            yield f"{self.name}_count{format_labels(labels)} {cumulative}"
+
+
+# Per-process registry; each gunicorn worker is scraped separately.
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics.values():
+                lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {metric.type}")
+                lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+
+registry = Registry()
+requests_total = registry.register(
+    Counter("http_requests_total", "Requests by route, method and status")
+)
+request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds", "Wall time of requests", DURATION_BUCKETS
+    )
+)
+response_size = registry.register(
+    Histogram("http_response_size_bytes", "Size of response bodies", SIZE_BUCKETS)
+)
+db_queries = registry.register(
+    Histogram("http_request_db_queries", "Queries per sampled request", QUERY_BUCKETS)
+)
+db_duration = registry.register(
+    Histogram(
+        "http_request_db_duration_seconds",
+        "Database time of sampled requests",
+        DURATION_BUCKETS,
+    )
+)
+cache_events = registry.register(
+    Counter("http_request_cache_total", "Response cache hits and misses")
+)
+password_pool_tasks = registry.register(
+    Gauge("password_pool_tasks", "Password hashing tasks queued or running")
+)
+password_pool_wait = registry.register(
+    Histogram(
+        "password_pool_wait_seconds",
+        "Time password tasks waited for a pool thread",
+        DURATION_BUCKETS,
+    )
+)
+password_pool_run = registry.register(
+    Histogram("password_pool_run_seconds", "Time password tasks ran", DURATION_BUCKETS)
+)
+password_pool_rejected = registry.register(
+    Counter("password_pool_rejected_total", "Password tasks turned away when full")
+)
+monobank_requests = registry.register(
+    Counter("monobank_requests_total", "Monobank API calls by endpoint and outcome")
+)
+monobank_duration = registry.register(
+    Histogram(
+        "monobank_request_duration_seconds",
+        "Wall time of Monobank API calls, retries included",
+        DURATION_BUCKETS,
+    )
+)
+
+
+def observe(route, method, status, duration, size, sample=None):
+    with registry.lock:
+        requests_total.inc({"route": route, "method": method, "status": status})
+        request_duration.observe({"route": route, "method": method}, duration)
+        if size is not None:
+            response_size.observe({"route": route}, size)
+        if sample is not None:
+            db_queries.observe({"route": route}, sample["queries"])
+            db_duration.observe({"route": route}, sample["db_time"])
+            for event in ("hits", "misses"):
+                if sample[event]:
+                    cache_events.inc({"route": route, "event": event}, sample[event])
+
+
+def is_scraper(request):
+    if settings.METRICS_PUBLIC:
+        return True
+    if not settings.METRICS_TOKEN:
+        return False
+    return constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    )
+
+
+def metrics_view(request):
+    # Unknown callers get the same 404 as a disabled endpoint.
+    if not settings.REQUEST_METRICS_ENABLED or not is_scraper(request):
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,148 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger("book_store.requests")
+
+
+class QueryTimer:
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.queries += 1
+
+
+class RequestSample:
+    def __init__(self):
+        self.timer = QueryTimer()
+        self.counters = Counter()
+        self.stack = ExitStack()
+
+    def __enter__(self):
+        self.token = metrics.request_counters.set(self.counters)
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self.timer))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stack.close()
+        metrics.request_counters.reset(self.token)
+
+    def as_dict(self):
+        return {
+            "queries": self.timer.queries,
+            "db_time": self.timer.time,
+            "hits": self.counters["hits"],
+            "misses": self.counters["misses"],
+        }
+
+
+# Every request feeds the per-route counters and duration histograms. Only a
+# REQUEST_METRICS_SAMPLE_RATE share of requests also times its queries and
+# cache lookups and gets a Server-Timing header and a log line.
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path == "/metrics":
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        if not self.is_sampled():
+            response = self.get_response(request)
+            self.observe(request, response, time.perf_counter() - start)
+            return response
+
+        with RequestSample() as sample:
+            response = self.get_response(request)
+        return self.report(request, response, time.perf_counter() - start, sample)
+
+    async def __acall__(self, request):
+        if request.path == "/metrics":
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        if not self.is_sampled():
+            response = await self.get_response(request)
+            self.observe(request, response, time.perf_counter() - start)
+            return response
+
+        with RequestSample() as sample:
+            response = await self.get_response(request)
+        return self.report(request, response, time.perf_counter() - start, sample)
+
+    @staticmethod
+    def is_sampled():
+        return random.random() < settings.REQUEST_METRICS_SAMPLE_RATE
+
+    @staticmethod
+    def get_route(request):
+        # Unmatched paths share one label to keep the series count bounded.
+        match = getattr(request, "resolver_match", None)
+        return match.route if match is not None else "unmatched"
+
+    def observe(self, request, response, duration, sample=None):
+        size = None if response.streaming else len(response.content)
+        metrics.observe(
+            self.get_route(request),
+            request.method,
+            response.status_code,
+            duration,
+            size,
+            sample,
+        )
+        return size
+
+    def report(self, request, response, duration, sample):
+        stats = sample.as_dict()
+        size = self.observe(request, response, duration, stats)
+        response["Server-Timing"] = (
+            f"app;dur={duration * 1000:.1f}, "
+            f'db;dur={stats["db_time"] * 1000:.1f};desc="{stats["queries"]} queries", '
+            f'cache;desc="{stats["hits"]} hits {stats["misses"]} misses"'
+        )
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "route": self.get_route(request),
+                    "status": response.status_code,
+                    "duration_ms": round(duration * 1000, 2),
+                    "db_queries": stats["queries"],
+                    "db_ms": round(stats["db_time"] * 1000, 2),
+                    "cache_hits": stats["hits"],
+                    "cache_misses": stats["misses"],
+                    "bytes": size,
+                }
+            )
+        )
+        return response
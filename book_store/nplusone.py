@@ -0,0 +1,123 @@
+"""
+pytest plugin that fails tests whose requests repeat the same SQL statement
+shape more than ``nplusone_threshold`` (pytest.ini) times: the N+1
+pattern. Registered by the root conftest.py. Only queries issued between
+request_started and request_finished count, so fixtures may seed freely.
+
+    @pytest.mark.nplusone(threshold=50)  # raise the limit for one test
+    @pytest.mark.nplusone(enabled=False)  # or switch it off
+"""
+import re
+import traceback
+from collections import Counter
+
+import pytest
+
+STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+IN_LIST_RE = re.compile(r"IN \((?:%s, )*%s\)")
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    sql = LITERAL_RE.sub("?", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def get_stack():
+    frames = [
+        frame
+        for frame in traceback.extract_stack()[:-3]
+        if not frame.filename.startswith("<")
+        and "site-packages" not in frame.filename
+        and "/lib/python" not in frame.filename
+        and not frame.filename.endswith("nplusone.py")
+    ]
+    return "".join(traceback.format_list(frames))
+
+
+class NPlusOneDetector:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.requests = 0
+        self.shapes = Counter()
+        self.violations = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.requests and sql.lstrip().upper().startswith(STATEMENTS):
+            shape = normalize(sql)
+            self.shapes[shape] += 1
+            if self.shapes[shape] == self.threshold + 1:
+                self.violations.append((shape, get_stack()))
+        return execute(sql, params, many, context)
+
+    def request_started(self, **kwargs):
+        if not self.requests:
+            self.shapes.clear()
+        self.requests += 1
+
+    def request_finished(self, **kwargs):
+        self.requests = max(self.requests - 1, 0)
+
+    def install(self):
+        from django.core.signals import request_finished, request_started
+        from django.db import connections
+
+        request_started.connect(self.request_started)
+        request_finished.connect(self.request_finished)
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+
+    def uninstall(self):
+        from django.core.signals import request_finished, request_started
+        from django.db import connections
+
+        request_started.disconnect(self.request_started)
+        request_finished.disconnect(self.request_finished)
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+    def get_report(self):
+        lines = [f"Same statement run more than {self.threshold} times in a request:"]
+        for shape, stack in self.violations:
+            lines.append(f"\n{shape}\n\nRepeated from:\n{stack}")
+        return "\n".join(lines)
+
+
+def pytest_addoption(parser):
+    parser.addini(
+        "nplusone_threshold",
+        "Times a statement shape may repeat within one request",
+        default="5",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "nplusone(threshold=None, enabled=True): tune N+1 detection"
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("nplusone")
+    options = marker.kwargs if marker else {}
+    if not options.get("enabled", True):
+        yield
+        return
+
+    threshold = options.get("threshold") or int(
+        item.config.getini("nplusone_threshold")
+    )
+    detector = NPlusOneDetector(threshold)
+    detector.install()
+    try:
+        outcome = yield
+    finally:
+        detector.uninstall()
+    if detector.violations and outcome.excinfo is None:
+        outcome.force_exception(
+            pytest.fail.Exception(detector.get_report(), pytrace=False)
+        )
@@ -61,6 +61,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_filters",
     "author",
     "book",
@@ -73,6 +74,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "book_store.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     # Django doesn't support serving static assets in a production-ready way, so we use the
     # excellent WhiteNoise package to do so instead. The WhiteNoise middleware must be listed
@@ -151,13 +153,19 @@ AUTH_PASSWORD_VALIDATORS = [
         "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
     },
     {
-        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+        "NAME": "api_v2.passwords.CommonPasswordValidator",
     },
     {
         "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
     },
 ]
 
+# Registration hashes and validates passwords on a capped thread pool
+# (api_v2.passwords). QUEUE_SIZE counts queued and running tasks.
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", "2"))
+PASSWORD_HASHING_QUEUE_SIZE = int(os.getenv("PASSWORD_HASHING_QUEUE_SIZE", "32"))
+PASSWORD_HASHING_QUEUE_TIMEOUT = 5
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -209,7 +217,7 @@ else:
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api_v2.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
@@ -251,8 +259,51 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Items per request and rows per INSERT/UPDATE of the /bulk/ endpoints; the
+# batch size can be lowered per request with ?batch_size=.
+BULK_MAX_ITEMS = 10000
+BULK_BATCH_SIZE = 500
+BULK_MAX_BATCH_SIZE = 5000
+
+# Books fetched, joined with their authors and sent per step of
+# /api/v2/books/export/.
+EXPORT_CHUNK_SIZE = 2000
+
+# Seconds a user loaded by api_v2.authentication.CachedJWTAuthentication stays
+# in Redis and in each process's own memory.
+JWT_USER_CACHE_TIMEOUT = 60
+JWT_USER_LOCAL_CACHE_TIMEOUT = 5
+
 
 MONOBANK_API_KEY = os.getenv("MONOBANK_API_KEY")
+MONOBANK_API_URL = os.getenv("MONOBANK_API_URL", "https://api.monobank.ua")
+MONOBANK_PUBKEY_CACHE_TIMEOUT = 60 * 60 * 24
+MONOBANK_CONNECT_TIMEOUT = 3.05
+MONOBANK_READ_TIMEOUT = 10
+MONOBANK_RETRIES = 2
+MONOBANK_POOL_SIZE = 10
+MONOBANK_BREAKER_FAILURES = 5
+MONOBANK_BREAKER_RESET_TIMEOUT = 30
+
+INVOICE_OUTBOX_MAX_ATTEMPTS = 8
+INVOICE_OUTBOX_RETRY_DELAY = 2
+INVOICE_OUTBOX_MAX_RETRY_DELAY = 60 * 5
+
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "true") == "true"
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", "0.05"))
+# /metrics answers only scrapers sending "Authorization: Bearer <METRICS_TOKEN>",
+# or everyone when METRICS_PUBLIC is set (e.g. behind a private network).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false") == "true"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "book_store.requests": {"handlers": ["console"], "level": "INFO"},
+    },
+}
 
 
 try:
@@ -7,6 +7,10 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # A file (rather than in-memory) test database lets concurrent
+        # requests in threaded tests wait for write locks instead of failing.
+        "OPTIONS": {"timeout": 20},
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
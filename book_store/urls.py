@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
     path("api/v2/", include("api_v2.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
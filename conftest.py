@@ -0,0 +1 @@
+pytest_plugins = ["book_store.nplusone"]
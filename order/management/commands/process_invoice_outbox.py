@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from order.outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Create pending Monobank invoices from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument("--interval", type=float, default=1.0)
+        parser.add_argument(
+            "--once", action="store_true", help="Process one batch and exit"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_outbox(options["batch_size"])
+            if processed:
+                self.stdout.write(f"Processed {processed} invoice(s)")
+            if options["once"]:
+                break
+            if processed < options["batch_size"]:
+                time.sleep(options["interval"])
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("order", "0008_order_pay_url"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-id"], name="order_order_user_id_0be077_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "-id"], name="order_order_status_f87ed1_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["created_at"], name="order_order_created_ffede0_idx"
+            ),
+        ),
+    ]
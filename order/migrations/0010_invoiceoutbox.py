@@ -0,0 +1,50 @@
+# Generated by Django 4.2.2 on 2026-10-18 04:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("order", "0009_order_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InvoiceOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("webhook_url", models.CharField(max_length=500)),
+                ("status", models.CharField(default="pending", max_length=20)),
+                ("attempts", models.IntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                (
+                    "order",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE, to="order.order"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="order_invoi_status_9c2f78_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.2 on 2026-10-18 04:19
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    OrderItem = apps.get_model("order", "OrderItem")
+    duplicates = (
+        OrderItem.objects.values("order_id", "book_id")
+        .annotate(items=Count("id"), total=Sum("quantity"))
+        .filter(items__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        items = OrderItem.objects.filter(
+            order_id=duplicate["order_id"], book_id=duplicate["book_id"]
+        ).order_by("id")
+        first = items.first()
+        items.exclude(pk=first.pk).delete()
+        OrderItem.objects.filter(pk=first.pk).update(quantity=duplicate["total"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("order", "0010_invoiceoutbox"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="orderitem",
+            constraint=models.UniqueConstraint(
+                fields=("order", "book"), name="unique_order_item_book"
+            ),
+        ),
+    ]
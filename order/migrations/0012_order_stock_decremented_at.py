@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-18 05:23
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_paid_orders(apps, schema_editor):
+    # Orders already paid have had their stock taken.
+    Order = apps.get_model("order", "Order")
+    Order.objects.filter(status="success").update(stock_decremented_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("order", "0011_orderitem_unique_book"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="stock_decremented_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_paid_orders, migrations.RunPython.noop),
+    ]
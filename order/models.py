@@ -1,9 +1,79 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+from django.db.models import Case, F, IntegerField, Prefetch, Sum, Value, When
 
 
 from book.models import Book
 
+# Monobank invoice statuses that are never followed by another one.
+FINAL_STATUSES = ["reversed", "failure", "expired"]
+
+
+class OrderError(Exception):
+    pass
+
+
+class BookNotFound(OrderError):
+    pass
+
+
+class NotEnoughBooks(OrderError):
+    pass
+
+
+class InvalidQuantity(OrderError):
+    pass
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_full_price(self):
+        return self.annotate(
+            items_price=Sum(F("orderitem__book__price") * F("orderitem__quantity"))
+        )
+
+    def with_items(self):
+        return self.with_full_price().prefetch_related(
+            Prefetch(
+                "orderitem_set",
+                queryset=OrderItem.objects.select_related("book").order_by("id"),
+            )
+        )
+
+    def create_with_items(self, user, rows, status="created"):
+        quantities = {}
+        for row in rows:
+            quantities[row["book_id"]] = (
+                quantities.get(row["book_id"], 0) + row["quantity"]
+            )
+
+        with transaction.atomic():
+            # Rows are locked in id order so that two orders for the same
+            # books cannot deadlock; in_bulk() would drop the ordering.
+            books = {
+                book.id: book
+                for book in Book.objects.select_for_update()
+                .filter(id__in=quantities)
+                .order_by("id")
+            }
+            for row in rows:
+                book_id = row["book_id"]
+                if book_id not in books:
+                    raise BookNotFound(f"Book with id {book_id} not found")
+                if books[book_id].count < quantities[book_id]:
+                    raise NotEnoughBooks(
+                        f"There are not enough books with id {book_id} in stock to create an order"
+                    )
+                if row["quantity"] <= 0:
+                    raise InvalidQuantity("Quantity must be more that 0")
+
+            order = self.create(user=user, status=status, created_at=timezone.now())
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, book_id=book_id, quantity=quantity)
+                for book_id, quantity in quantities.items()
+            )
+        return order
+
 
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -12,36 +82,98 @@ class Order(models.Model):
     created_at = models.DateTimeField(blank=True)
     invoice_id = models.CharField(max_length=200, null=True)
     pay_url = models.CharField(max_length=500, null=True)
+    # Set by the first success callback of the invoice together with the stock
+    # decrement, so a success redelivered after another status is a no-op.
+    stock_decremented_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-id"]),
+            models.Index(fields=["status", "-id"]),
+            models.Index(fields=["created_at"]),
+        ]
 
     @property
     def full_price(self):
-        full_price = 0
-        for item in OrderItem.objects.filter(order_id=self.id):
-            full_price += Book.objects.get(pk=item.book_id).price * item.quantity
-        return full_price
+        if hasattr(self, "items_price"):
+            return self.items_price or 0
+        return (
+            OrderItem.objects.filter(order_id=self.id).aggregate(
+                full_price=Sum(F("book__price") * F("quantity"))
+            )["full_price"]
+            or 0
+        )
 
     def get_info(self):
-        books = []
-        for item in OrderItem.objects.filter(order_id=self.id):
-            book = Book.objects.get(pk=item.book_id)
-            books.append(
-                {"book_id": book.id, "book_name": book.name, "quantity": item.quantity}
-            )
+        if "orderitem_set" in getattr(self, "_prefetched_objects_cache", {}):
+            items = list(self.orderitem_set.all())
+        else:
+            items = list(self.orderitem_set.select_related("book").order_by("id"))
+        books = [
+            {
+                "book_id": item.book.id,
+                "book_name": item.book.name,
+                "quantity": item.quantity,
+            }
+            for item in items
+        ]
+        if hasattr(self, "items_price"):
+            full_price = self.full_price
+        else:
+            full_price = sum(item.book.price * item.quantity for item in items)
 
         order_info = {
             "id": self.id,
-            "user_id": self.user.id,
+            "user_id": self.user_id,
             "books": books,
             "status": self.status,
-            "full_price": self.full_price,
+            "full_price": full_price,
             "created_at": self.created_at,
             "invoice_id": self.invoice_id,
             "pay_url": self.pay_url,
         }
         return order_info
 
+    def decrement_stock(self):
+        quantities = dict(
+            OrderItem.objects.filter(order_id=self.id)
+            .values("book_id")
+            .annotate(quantity=Sum("quantity"))
+            .values_list("book_id", "quantity")
+        )
+        if not quantities:
+            return 0
+        decrement = Case(
+            *[When(pk=book_id, then=Value(qty)) for book_id, qty in quantities.items()],
+            output_field=IntegerField(),
+        )
+        return Book.objects.filter(pk__in=quantities).update(
+            count=F("count") - decrement
+        )
+
 
 class OrderItem(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     quantity = models.IntegerField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "book"], name="unique_order_item_book"
+            )
+        ]
+
+
+class InvoiceOutbox(models.Model):
+    order = models.OneToOneField(Order, on_delete=models.CASCADE)
+    webhook_url = models.CharField(max_length=500)
+    status = models.CharField(max_length=20, default="pending")
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
@@ -1,19 +1,169 @@
 import base64
 import hashlib
+import threading
+import time
 
 import ecdsa
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from book.models import Book
 from .models import OrderItem
+from book_store import metrics
 
+PUBKEY_CACHE_KEY = "monobank:pubkey"
+PUBKEY_REFRESH_INTERVAL = 60
 
-def verify_signature(pub_key_base64, x_sign_base64, body_bytes):
+verifying_key = {"pub_key": None, "key": None, "refreshed_at": 0.0}
+verifying_key_lock = threading.Lock()
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+class MonobankUnavailable(requests.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self):
+        with self.lock:
+            if self.state == "open":
+                return False
+            if self.state == "half-open":
+                # Let a single trial request through; the rest keep failing
+                # fast until it reports back.
+                self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class MonobankClient:
+    def __init__(
+        self,
+        base_url,
+        token,
+        connect_timeout=3.05,
+        read_timeout=10,
+        retries=2,
+        pool_size=10,
+        breaker_failures=5,
+        breaker_reset_timeout=30,
+    ):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_timeout)
+
+        # Only GETs are retried after the request was sent; connection errors
+        # are retried for any method because nothing reached the server.
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers["X-Token"] = token or ""
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, endpoint, method, path, **kwargs):
+        if not self.breaker.allow_request():
+            self.record(endpoint, "rejected")
+            raise MonobankUnavailable("Monobank circuit breaker is open")
+
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs
+            )
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            self.record(endpoint, "error", time.perf_counter() - start)
+            response = getattr(exc, "response", None)
+            if response is None or response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.record(endpoint, "ok", time.perf_counter() - start)
+        self.breaker.record_success()
+        return response.json()
+
+    @staticmethod
+    def record(endpoint, outcome, duration=None):
+        # Calls turned away by the open breaker never reach Monobank, so they
+        # are counted without a duration.
+        with metrics.registry.lock:
+            metrics.monobank_requests.inc({"endpoint": endpoint, "outcome": outcome})
+            if duration is not None:
+                metrics.monobank_duration.observe({"endpoint": endpoint}, duration)
+
+    def create_invoice(self, body):
+        return self.request(
+            "invoice_create", "POST", "/api/merchant/invoice/create", json=body
+        )
+
+    def get_pubkey(self):
+        return self.request("pubkey", "GET", "/api/merchant/pubkey")["key"]
+
+
+def get_client():
+    base_url = settings.MONOBANK_API_URL
+    with clients_lock:
+        if base_url not in clients:
+            clients[base_url] = MonobankClient(
+                base_url,
+                settings.MONOBANK_API_KEY,
+                connect_timeout=settings.MONOBANK_CONNECT_TIMEOUT,
+                read_timeout=settings.MONOBANK_READ_TIMEOUT,
+                retries=settings.MONOBANK_RETRIES,
+                pool_size=settings.MONOBANK_POOL_SIZE,
+                breaker_failures=settings.MONOBANK_BREAKER_FAILURES,
+                breaker_reset_timeout=settings.MONOBANK_BREAKER_RESET_TIMEOUT,
+            )
+        return clients[base_url]
+
+
+def load_verifying_key(pub_key_base64):
+    pub_key_bytes = base64.b64decode(pub_key_base64)
+    return ecdsa.VerifyingKey.from_pem(pub_key_bytes.decode())
+
+
+def verify_signature(pub_key, x_sign_base64, body_bytes):
     try:
-        pub_key_bytes = base64.b64decode(pub_key_base64)
+        if not isinstance(pub_key, ecdsa.VerifyingKey):
+            pub_key = load_verifying_key(pub_key)
         signature_bytes = base64.b64decode(x_sign_base64)
-        pub_key = ecdsa.VerifyingKey.from_pem(pub_key_bytes.decode())
         check = pub_key.verify(
             signature_bytes,
             body_bytes,
@@ -28,37 +178,64 @@ def verify_signature(pub_key_base64, x_sign_base64, body_bytes):
         return False
 
 
+def get_verifying_key(refresh=False):
+    with verifying_key_lock:
+        if verifying_key["key"] is not None and not refresh:
+            return verifying_key["key"]
+
+        pub_key = cache.get(PUBKEY_CACHE_KEY)
+        if pub_key is None or pub_key == verifying_key["pub_key"]:
+            # Another worker may already have cached a rotated key; only go
+            # to Monobank when the shared copy is missing or the one we hold.
+            if refresh and (
+                time.monotonic() - verifying_key["refreshed_at"]
+                < PUBKEY_REFRESH_INTERVAL
+            ):
+                return verifying_key["key"]
+            pub_key = get_mono_token()
+            verifying_key["refreshed_at"] = time.monotonic()
+            cache.set(PUBKEY_CACHE_KEY, pub_key, settings.MONOBANK_PUBKEY_CACHE_TIMEOUT)
+
+        verifying_key["pub_key"] = pub_key
+        verifying_key["key"] = load_verifying_key(pub_key)
+        return verifying_key["key"]
+
+
+def verify_callback_signature(x_sign_base64, body_bytes):
+    if verify_signature(get_verifying_key(), x_sign_base64, body_bytes):
+        return True
+    # Monobank may have rotated its key: retry once with a fresh one.
+    return verify_signature(get_verifying_key(refresh=True), x_sign_base64, body_bytes)
+
+
 def create_mono_order(order, webhook_url):
+    basket = fill_mono_basket(order.id)
     body = {
-        "amount": order.full_price,
+        "amount": sum(row["sum"] for row in basket),
         "merchantPaymInfo": {
             "reference": str(order.id),
-            "basketOrder": fill_mono_basket(order.id),
+            "basketOrder": basket,
         },
         "webHookUrl": webhook_url,
     }
-    r = requests.post(
-        "https://api.monobank.ua/api/merchant/invoice/create",
-        headers={"X-Token": settings.MONOBANK_API_KEY},
-        json=body,
-    )
-    r.raise_for_status()
-    url = r.json()["pageUrl"]
+    invoice = get_client().create_invoice(body)
+    url = invoice["pageUrl"]
     order.pay_url = url
-    order.invoice_id = r.json()["invoiceId"]
-    order.save()
+    order.invoice_id = invoice["invoiceId"]
+    order.status = "created"
+    order.save(update_fields=["pay_url", "invoice_id", "status"])
     return {"order_id": order.id, "pageUrl": url}
 
 
 def fill_mono_basket(order_id):
     basket = []
-    for item in OrderItem.objects.filter(order_id=order_id):
-        book = Book.objects.get(pk=item.book_id)
+    items = OrderItem.objects.filter(order_id=order_id).select_related("book")
+    for item in items.order_by("id"):
         basket.append(
             {
-                "name": book.name,
+                "name": item.book.name,
                 "qty": item.quantity,
-                "sum": book.price * item.quantity,
+                "sum": item.book.price * item.quantity,
                 "unit": "шт.",
             }
         )
@@ -66,8 +243,4 @@ def fill_mono_basket(order_id):
 
 
 def get_mono_token():
-    key = requests.get(
-        "https://api.monobank.ua/api/merchant/pubkey",
-        headers={"X-Token": settings.MONOBANK_API_KEY},
-    ).json()["key"]
-    return key
+    return get_client().get_pubkey()
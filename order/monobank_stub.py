@@ -0,0 +1,101 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ecdsa
+
+
+class MonobankStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/api/merchant/pubkey":
+            self.server.stub.calls.append(("GET", self.path, None))
+            self.send_json({"key": self.server.stub.public_key})
+        else:
+            self.send_json({"errText": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/merchant/invoice/create":
+            self.server.stub.calls.append(("POST", self.path, body))
+            time.sleep(self.server.stub.delay)
+            if self.server.stub.take_failure():
+                self.send_json({"errText": "stub failure"}, status=500)
+            else:
+                self.send_json(self.server.stub.create_invoice(body))
+        else:
+            self.send_json({"errText": "not found"}, status=404)
+
+    def send_json(self, body, status=200):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Local stand-in for api.monobank.ua used by tests and load tests. It signs
+# callbacks with its own key and serves the matching public key.
+class MonobankStub:
+    handler_class = MonobankStubHandler
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.calls = []
+        self.invoices = 0
+        self.failures = 0
+        self.delay = 0
+        self.lock = threading.Lock()
+        self.rotate_key()
+        self.server = ThreadingHTTPServer((host, port), self.handler_class)
+        self.server.stub = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def rotate_key(self):
+        self.signing_key = ecdsa.SigningKey.generate(curve=ecdsa.SECP256k1)
+        pem = self.signing_key.get_verifying_key().to_pem()
+        self.public_key = base64.b64encode(pem).decode()
+
+    def take_failure(self):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                return True
+        return False
+
+    def create_invoice(self, body):
+        with self.lock:
+            self.invoices += 1
+            invoice_id = f"stub{self.invoices}"
+        return {"invoiceId": invoice_id, "pageUrl": f"{self.url}/pay/{invoice_id}"}
+
+    def sign(self, body_bytes):
+        signature = self.signing_key.sign(
+            body_bytes, hashfunc=hashlib.sha256, sigencode=ecdsa.util.sigencode_der
+        )
+        return base64.b64encode(signature).decode()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
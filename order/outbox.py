@@ -0,0 +1,72 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import InvoiceOutbox
+from .mono import create_mono_order
+
+logger = logging.getLogger(__name__)
+
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def enqueue_invoice(order, webhook_url):
+    return InvoiceOutbox.objects.create(order=order, webhook_url=webhook_url)
+
+
+def get_retry_delay(attempts):
+    delay = settings.INVOICE_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.INVOICE_OUTBOX_MAX_RETRY_DELAY))
+
+
+def claim_entries(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            InvoiceOutbox.objects.select_for_update(skip_locked=True)
+            .select_related("order")
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        # Entries left behind by a crashed worker become due again later.
+        InvoiceOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+            next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    return entries
+
+
+def process_entry(entry):
+    try:
+        create_mono_order(entry.order, entry.webhook_url)
+    except Exception as exc:
+        entry.attempts += 1
+        entry.last_error = repr(exc)
+        if entry.attempts >= settings.INVOICE_OUTBOX_MAX_ATTEMPTS:
+            entry.status = "failed"
+            entry.order.status = "invoice_failed"
+            entry.order.save(update_fields=["status"])
+            logger.error("Invoice for order %s failed: %r", entry.order_id, exc)
+        else:
+            entry.next_attempt_at = timezone.now() + get_retry_delay(entry.attempts)
+            logger.warning(
+                "Invoice for order %s failed, attempt %s: %r",
+                entry.order_id,
+                entry.attempts,
+                exc,
+            )
+    else:
+        entry.attempts += 1
+        entry.status = "done"
+        entry.last_error = ""
+    entry.save()
+    return entry
+
+
+def process_outbox(batch_size=10):
+    entries = claim_entries(batch_size)
+    for entry in entries:
+        process_entry(entry)
+    return len(entries)
@@ -1,3 +1,77 @@
-from django.test import TestCase
+import pytest
+import requests
 
-# Create your tests here.
+from .mono import MonobankClient, MonobankUnavailable
+from .monobank_stub import MonobankStub
+from book_store import metrics
+
+INVOICE = {"amount": 100, "merchantPaymInfo": {"reference": "1", "basketOrder": []}}
+
+
+@pytest.fixture
+def mono_stub():
+    metrics.registry.clear()
+    with MonobankStub() as stub:
+        yield stub
+
+
+def count_requests(endpoint, outcome):
+    labels = (("endpoint", endpoint), ("outcome", outcome))
+    return metrics.monobank_requests.values.get(labels, 0)
+
+
+def test_monobank_client_reuses_connections(mono_stub):
+    client = MonobankClient(mono_stub.url, "token")
+    assert client.create_invoice(INVOICE)["invoiceId"] == "stub1"
+    assert client.get_pubkey() == mono_stub.public_key
+
+    assert count_requests("invoice_create", "ok") == 1
+    assert count_requests("invoice_create", "error") == 0
+    assert count_requests("pubkey", "ok") == 1
+    counts, total = metrics.monobank_duration.values[(("endpoint", "pubkey"),)]
+    assert sum(counts) == 1
+    assert total > 0
+    assert (
+        'monobank_requests_total{endpoint="pubkey",outcome="ok"} 1.0'
+        in metrics.registry.render()
+    )
+    assert len(client.session.get_adapter(mono_stub.url).poolmanager.pools) == 1
+
+
+def test_monobank_client_read_timeout(mono_stub):
+    mono_stub.delay = 0.5
+    client = MonobankClient(mono_stub.url, "token", read_timeout=0.1)
+    with pytest.raises(requests.ReadTimeout):
+        client.create_invoice(INVOICE)
+    assert len(mono_stub.calls) == 1
+    assert count_requests("invoice_create", "error") == 1
+
+
+def test_monobank_client_circuit_breaker_fails_fast(mono_stub):
+    mono_stub.failures = 10
+    client = MonobankClient(
+        mono_stub.url, "token", breaker_failures=2, breaker_reset_timeout=60
+    )
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            client.create_invoice(INVOICE)
+
+    with pytest.raises(MonobankUnavailable):
+        client.create_invoice(INVOICE)
+    assert client.breaker.state == "open"
+    assert len(mono_stub.calls) == 2
+    assert count_requests("invoice_create", "error") == 2
+    assert count_requests("invoice_create", "rejected") == 1
+
+
+def test_monobank_client_circuit_breaker_recovers(mono_stub):
+    mono_stub.failures = 1
+    client = MonobankClient(
+        mono_stub.url, "token", breaker_failures=1, breaker_reset_timeout=0
+    )
+    with pytest.raises(requests.HTTPError):
+        client.create_invoice(INVOICE)
+    assert client.breaker.state == "half-open"
+
+    assert client.create_invoice(INVOICE)["invoiceId"] == "stub1"
+    assert client.breaker.state == "closed"